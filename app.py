@@ -1,25 +1,72 @@
 import os
 import json
+import fcntl
+import atexit
+import socket
+import threading
+import time
 import uuid
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from flask_compress import Compress
 from flask import Flask, request, jsonify, render_template
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from dotenv import load_dotenv
-from utils.api_utils import process_deepseek_response, query_deepseek
+from utils.api_utils import (
+    MAX_OUTPUT_TOKENS,
+    admission,
+    complete_deepseek,
+    process_deepseek_response,
+    provider_pool,
+    query_deepseek,
+)
+from utils.batch_utils import (
+    BATCH_ANSWER_TOKENS,
+    MAX_BATCH_QUESTIONS,
+    format_questions,
+    group_questions,
+    split_answers,
+)
+from utils.limit_utils import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    UpstreamOverloaded,
+    estimate_tokens,
+)
+from utils.worker_pool import ExtractionError, ExtractionPool, detach_main_module
+from utils.upload_utils import (
+    UploadError,
+    finalize_upload,
+    get_upload,
+    init_upload,
+    write_chunk,
+)
 from utils.drive_utils import (
     authenticate_google_drive,
     upload_file_to_drive,
 )
 from flask_cors import CORS
 
-from utils.pdf_utils import extract_pdf_tables, extract_pdf_text, summarize_text
+from utils.page_store import append_pages
+from utils.pdf_utils import PREVIEW_CHARS, SUMMARY_SOURCE_CHARS, summarize_text
+from utils.session_store import DriveBackend, LocalDirectoryBackend, SessionStore
+from utils.session_utils import (
+    ingestion_progress,
+    ingestion_stalled,
+    load_content,
+    load_text,
+    save_content,
+)
+from utils.table_store import MAX_CONTEXT_CHARS as TABLE_CONTEXT_CHARS
+from utils.table_store import append_tables, open_table_store
 
 # Initialize Flask application
 app = Flask(__name__)
 Compress(app)  # Enable response compression
 
-# Set max request size to 10MB
+# Set max request size to 10MB. Larger files use the resumable /upload/init
+# protocol, where each chunk is a separate request.
 app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10MB limit
 
 # Apply rate limiting (200 requests per minute per IP)
@@ -28,7 +75,24 @@ limiter = Limiter(get_remote_address, app=app, default_limits=["20 per minute"])
 
 @app.errorhandler(413)
 def request_entity_too_large(error):
-    return jsonify({"error": "File too large. Max size allowed is 10MB."}), 413
+    return (
+        jsonify(
+            {
+                "error": "File too large. Max size allowed is 10MB. "
+                "Use /upload/init for larger files."
+            }
+        ),
+        413,
+    )
+
+
+@app.errorhandler(UpstreamOverloaded)
+def upstream_overloaded(error):
+    response = jsonify(
+        {"error": "The service is busy right now. Please try again shortly."}
+    )
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 503
 
 
 # Enable CORS for all routes
@@ -61,11 +125,110 @@ UPLOAD_DIR = "uploads"
 os.makedirs(CONTENT_DIR, exist_ok=True)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# Initialize Google Drive service based on environment
-if ENV == "production":
-    drive_service = authenticate_google_drive()
+# Progressive ingestion: the first pages are extracted before /upload returns
+# and the rest are appended to the session in the background
+PROGRESSIVE_FIRST_PAGES = int(os.getenv("PROGRESSIVE_FIRST_PAGES", 5))
+PROGRESSIVE_BATCH_PAGES = int(os.getenv("PROGRESSIVE_BATCH_PAGES", 10))
+# Archive the session to the shared store after every N background batches
+PROGRESSIVE_ARCHIVE_BATCHES = int(os.getenv("PROGRESSIVE_ARCHIVE_BATCHES", 1))
+# A "processing" session whose ingestion has not saved progress for this long
+# was orphaned (process restarted, node scaled to zero) and is resumed from
+# its archived PDF, or marked "partial" if there is none
+INGEST_STALE_SECONDS = float(os.getenv("INGEST_STALE_SECONDS", 900))
+ingest_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INGEST_WORKERS", 2)), thread_name_prefix="ingest"
+)
+
+# Upstream requests of /chat/batch run concurrently on these threads;
+# admission control still bounds what actually reaches the API
+batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BATCH_WORKERS", 8)), thread_name_prefix="batch"
+)
+
+# Text and table extraction run in recycled subprocess workers with per-job
+# timeouts and memory caps (see utils/worker_pool.py)
+extraction_pool = ExtractionPool()
+atexit.register(extraction_pool.shutdown)
+
+# Answer simple table cell lookups ("Q3 revenue") without calling the API
+TABLE_LOCAL_ANSWERS = os.getenv("TABLE_LOCAL_ANSWERS", "false").lower() == "true"
+
+# Pre-load heavy modules and Drive auth in the background once the port is bound
+WARM_UP = os.getenv("WARM_UP", "false").lower() == "true"
+
+# Google Drive service (production only), authenticated on first use so that
+# building the discovery client does not slow down cold starts
+_drive_service = None
+_drive_lock = threading.Lock()
+
+
+def get_drive_service():
+    """Return the Google Drive service, authenticating on first use."""
+    global _drive_service
+    if ENV != "production":
+        return None
+    if _drive_service is None:
+        with _drive_lock:
+            if _drive_service is None:
+                _drive_service = authenticate_google_drive()
+    return _drive_service
+
+
+# Tiered session storage: the local content directory caches sessions that
+# are archived in a shared store, so any node can answer for any session.
+# "drive" archives to the Drive upload folder, "local" to SESSION_STORE_DIR
+# (e.g. a shared mount) and "none" keeps sessions on the node that made them.
+SESSION_STORE = os.getenv("SESSION_STORE", "drive" if ENV == "production" else "none")
+if SESSION_STORE == "drive":
+    session_backend = DriveBackend(get_drive_service)
+elif SESSION_STORE == "local":
+    session_backend = LocalDirectoryBackend(
+        os.getenv("SESSION_STORE_DIR", "session_store")
+    )
 else:
-    drive_service = None
+    session_backend = None
+
+
+def rebuild_session(session_id, local_pdf_path):
+    """Re-extract a session from its archived PDF (see SessionStore.ensure_local)."""
+    print(f"Rebuilding session {session_id} from its archived PDF")
+    ingest_pdf(local_pdf_path, session_id=session_id, archive_source=False)
+
+
+session_store = SessionStore(CONTENT_DIR, session_backend, rebuild=rebuild_session)
+
+
+def warm_up(port=None, wait_timeout=30):
+    """
+    Start the extraction workers (which pre-load the PDF libraries) and
+    authenticate with Drive.
+
+    If a port is given, waits until the server accepts connections so the
+    warm-up never delays binding.
+    """
+    if port:
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+
+    start = time.monotonic()
+    try:
+        extraction_pool.start()
+        get_drive_service()
+        print(f"Warm-up finished in {time.monotonic() - start:.2f}s")
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
+
+def start_warm_up(port=None):
+    """Run warm_up() in a daemon thread (e.g. from a gunicorn post_worker_init hook)."""
+    thread = threading.Thread(target=warm_up, args=(port,), daemon=True)
+    thread.start()
+    return thread
 
 
 @app.route("/upload", methods=["POST"])
@@ -93,49 +256,434 @@ def upload_pdf():
         safe_filename = str(uuid.uuid4()) + ".pdf"
         local_pdf_path = os.path.join("temp", safe_filename)
         file.save(local_pdf_path)
+    except Exception as e:
+        return jsonify({"error": f"Upload failed: {str(e)}"}), 500
 
-        # Process file
-        pdf_text = extract_pdf_text(local_pdf_path)
-        pdf_tables = extract_pdf_tables(local_pdf_path)
+    return process_pdf(local_pdf_path, file.filename)
 
-        if not pdf_text and not pdf_tables:
-            os.remove(local_pdf_path)  # Cleanup before returning error
-            return jsonify({"error": "Failed to extract content from PDF"}), 500
 
-        # Upload to Drive only in production
-        drive_file_id = None
-        if ENV == "production":
-            drive_file_id = upload_file_to_drive(
-                drive_service, local_pdf_path, file.filename
-            )
+def process_pdf(local_pdf_path, filename):
+    """
+    Extract the first pages of a saved PDF into a new chat session.
 
-        # Clean up temp file
-        os.remove(local_pdf_path)
+    The remaining pages are extracted in the background, so the session is
+    chat-ready regardless of document length.
+    """
+    try:
+        session_id, content = ingest_pdf(local_pdf_path, filename)
+    except Exception as e:
+        return jsonify({"error": f"Upload failed: {str(e)}"}), 500
+    if session_id is None:
+        return jsonify({"error": "Failed to extract content from PDF"}), 500
+
+    return jsonify(
+        {
+            "message": "PDF uploaded successfully. Click next to ask a question!",
+            "session_id": session_id,
+            "pages_ready": content["pages_done"],
+            "page_count": content["page_count"],
+        }
+    )
 
-        # Save extracted content
-        session_id = str(uuid.uuid4())
-        content_path = os.path.join(CONTENT_DIR, f"{session_id}.json")
-        with open(content_path, "w") as f:
-            json.dump(
+
+def extract_page_range(
+    local_pdf_path, first_page, last_page, errors, priority=PRIORITY_INTERACTIVE
+):
+    """
+    Extract the text and tables of a page range.
+
+    Returns (pages, tables). A failed job (timeout, crash or memory kill) is
+    recorded in errors and yields nothing, so one bad table does not cost the
+    text of the range or the rest of the document.
+    """
+    results = []
+    for job in ("extract_pdf_pages", "extract_pdf_tables"):
+        try:
+            results.append(
+                extraction_pool.run(
+                    job, local_pdf_path, first_page, last_page, priority=priority
+                )
+            )
+        except ExtractionError as e:
+            errors.append(
                 {
-                    "text": pdf_text,
-                    "tables": pdf_tables,
-                    "drive_file_id": drive_file_id,
-                },
-                f,
+                    "job": job,
+                    "first_page": first_page,
+                    "last_page": last_page,
+                    "error": str(e),
+                }
             )
+            results.append([])
+    return tuple(results)
 
-        return jsonify(
-            {
-                "message": "PDF uploaded successfully. Click next to ask a question!",
-                "session_id": session_id,
-            }
+
+def ingest_pdf(local_pdf_path, filename=None, session_id=None, archive_source=True):
+    """
+    Extract the first pages of a PDF into a session and queue the rest.
+
+    Creates a new session unless session_id is given (when rebuilding an
+    archived session). Returns (session_id, content), or (None, None) if
+    the PDF has no extractable content. Takes ownership of the local file.
+    """
+    handed_off = False
+    try:
+        page_count = extraction_pool.run("get_page_count", local_pdf_path)
+        if not page_count:
+            return None, None
+
+        # Process the first pages synchronously
+        pages_ready = min(PROGRESSIVE_FIRST_PAGES, page_count)
+        extraction_errors = []
+        pdf_pages, pdf_tables = extract_page_range(
+            local_pdf_path, 1, pages_ready, extraction_errors
+        )
+
+        if not pdf_pages and not pdf_tables and pages_ready == page_count:
+            return None, None
+
+        # Save extracted content: text page by page, tables in the columnar
+        # table store and metadata as JSON
+        session_id = session_id or str(uuid.uuid4())
+        append_pages(CONTENT_DIR, session_id, pdf_pages)
+        table_count = append_tables(CONTENT_DIR, session_id, pdf_tables)
+        content = {
+            "text_pages": len(pdf_pages),
+            "table_count": table_count,
+            "drive_file_id": None,
+            "page_count": page_count,
+            "pages_done": pages_ready,
+            "status": "processing",
+            "extraction_errors": extraction_errors,
+        }
+        save_content(CONTENT_DIR, session_id, content)
+
+        # Archive before returning the session ID, so other nodes can serve
+        # the first pages and re-extract from the PDF if this node goes away
+        session_store.archive(session_id)
+        if archive_source:
+            source_id = session_store.archive_source(session_id, local_pdf_path)
+            if SESSION_STORE == "drive" and source_id:
+                content["drive_file_id"] = source_id
+                save_content(CONTENT_DIR, session_id, content)
+                session_store.archive(session_id)
+
+        # The background task now owns the local file
+        ingest_executor.submit(
+            finish_ingestion, session_id, local_pdf_path, filename, archive_source
         )
+        handed_off = True
+        return session_id, content
+
+    finally:
+        if not handed_off and os.path.exists(local_pdf_path):
+            os.remove(local_pdf_path)  # Ensure cleanup
+
+
+def finish_ingestion(session_id, local_pdf_path, filename, archive_source=True):
+    """
+    Extract the remaining pages in batches, archiving the session's
+    artifacts to the shared session store as they grow.
+    """
+    content = None
+    try:
+        content = load_content(CONTENT_DIR, session_id)
+        page_count = content["page_count"]
+        batches = 0
+
+        while content["pages_done"] < page_count:
+            first_page = content["pages_done"] + 1
+            last_page = min(first_page + PROGRESSIVE_BATCH_PAGES - 1, page_count)
+
+            pdf_pages, pdf_tables = extract_page_range(
+                local_pdf_path,
+                first_page,
+                last_page,
+                content.setdefault("extraction_errors", []),
+                priority=PRIORITY_BACKGROUND,
+            )
+            content["text_pages"] += append_pages(CONTENT_DIR, session_id, pdf_pages)
+            content["table_count"] += append_tables(CONTENT_DIR, session_id, pdf_tables)
+            content["pages_done"] = last_page
+            save_content(CONTENT_DIR, session_id, content)
+
+            # Other nodes see the progress, not just the first pages
+            batches += 1
+            if batches % PROGRESSIVE_ARCHIVE_BATCHES == 0 and last_page < page_count:
+                session_store.archive(session_id)
+
+        if content["text_pages"] or content["table_count"]:
+            content["status"] = "complete"
+        else:
+            content["status"] = "failed"
+            content["error"] = "Failed to extract content from PDF"
+        save_content(CONTENT_DIR, session_id, content)
+        session_store.archive(session_id)
+
+        # Without the Drive session store, production still keeps the PDF
+        if ENV == "production" and SESSION_STORE != "drive" and archive_source:
+            content["drive_file_id"] = upload_file_to_drive(
+                get_drive_service(), local_pdf_path, filename
+            )
+            save_content(CONTENT_DIR, session_id, content)
 
     except Exception as e:
+        print(f"Error ingesting session {session_id}: {e}")
+        if content and content.get("status") == "processing":
+            content["status"] = "failed"
+            content["error"] = f"Processing failed: {str(e)}"
+            save_content(CONTENT_DIR, session_id, content)
+            session_store.archive(session_id)
+    finally:
         if os.path.exists(local_pdf_path):
-            os.remove(local_pdf_path)  # Ensure cleanup on error
-        return jsonify({"error": f"Upload failed: {str(e)}"}), 500
+            os.remove(local_pdf_path)  # Clean up temp file
+
+
+def claim_stalled_ingestion(session_id):
+    """
+    Take over a session whose ingestion stopped, and resume it in the
+    background. Returns True if this process claimed it.
+    """
+    lock_path = os.path.join(CONTENT_DIR, f"{session_id}.resume.lock")
+    with open(lock_path, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False  # Another process is claiming it right now
+        # Re-check under the lock: saving bumps the heartbeat, so other
+        # processes see the session as alive from here on
+        content = load_content(CONTENT_DIR, session_id)
+        if not content or not ingestion_stalled(
+            CONTENT_DIR, session_id, content, INGEST_STALE_SECONDS
+        ):
+            return False
+        save_content(CONTENT_DIR, session_id, content)
+        session_store.claim(session_id)
+
+    print(f"Resuming stalled ingestion of session {session_id}")
+    ingest_executor.submit(resume_ingestion, session_id)
+    return True
+
+
+def resume_ingestion(session_id):
+    """Continue ingestion from pages_done using the archived source PDF."""
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf", dir=UPLOAD_DIR)
+    os.close(fd)
+    if session_store.fetch_source(session_id, pdf_path):
+        finish_ingestion(session_id, pdf_path, None, archive_source=False)
+        return
+
+    os.remove(pdf_path)
+    content = load_content(CONTENT_DIR, session_id)
+    content["status"] = (
+        "partial" if content["text_pages"] or content["table_count"] else "failed"
+    )
+    content["error"] = (
+        f"Processing stopped after page {content['pages_done']} of "
+        f"{content['page_count']}"
+    )
+    save_content(CONTENT_DIR, session_id, content)
+    session_store.archive(session_id)
+
+
+def upload_error_response(error):
+    response = {"error": str(error)}
+    response.update(error.details)
+    return jsonify(response), error.status
+
+
+# Resumable uploads for large files: init, PUT chunks at an offset, finalize.
+# Chunks are streamed straight to disk and hashed as they arrive.
+@app.route("/upload/init", methods=["POST"])
+def init_chunked_upload():
+    data = request.get_json(silent=True) or {}
+    try:
+        upload = init_upload(UPLOAD_DIR, data.get("filename", ""), data.get("size"))
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify(upload), 201
+
+
+@app.route("/upload/<upload_id>", methods=["GET"])
+def get_chunked_upload(upload_id):
+    try:
+        upload = get_upload(UPLOAD_DIR, upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify(upload)
+
+
+@app.route("/upload/<upload_id>", methods=["PUT"])
+@limiter.limit("120 per minute")
+def put_upload_chunk(upload_id):
+    offset = request.args.get("offset", type=int)
+    if offset is None:
+        return jsonify({"error": "Missing offset"}), 400
+
+    try:
+        new_offset = write_chunk(
+            UPLOAD_DIR, upload_id, offset, request.stream, request.content_length
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify({"upload_id": upload_id, "offset": new_offset})
+
+
+@app.route("/upload/<upload_id>/finalize", methods=["POST"])
+def finalize_chunked_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        pdf_path, filename, _ = finalize_upload(
+            UPLOAD_DIR, upload_id, data.get("sha256")
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    return process_pdf(pdf_path, filename)
+
+
+def load_chat_session(session_id):
+    """
+    Load a session for answering questions.
+
+    Returns (content, None), or (None, response) if there is nothing to
+    answer from yet.
+    """
+    # Fetch the session from the shared session store if it was created on
+    # another node
+    session_store.ensure_local(session_id)
+    content = load_content(CONTENT_DIR, session_id)
+    if content is None:
+        return None, (jsonify({"error": "No PDF content available"}), 400)
+    if ingestion_stalled(CONTENT_DIR, session_id, content, INGEST_STALE_SECONDS):
+        claim_stalled_ingestion(session_id)
+        content = load_content(CONTENT_DIR, session_id)
+
+    has_text = bool(content.get("text") or content.get("text_pages"))
+    has_tables = bool(content.get("tables") or content.get("table_count"))
+
+    # Background ingestion may still be running; answer from the pages
+    # extracted so far
+    if not has_text and not has_tables:
+        if content.get("status") == "processing":
+            response = jsonify(
+                {
+                    "answer": "The document is still being processed. Please try again in a moment.",
+                    "pages_covered": None,
+                    "ingestion": ingestion_progress(content),
+                }
+            )
+            return None, response
+        error = content.get("error", "No PDF content available")
+        return None, (jsonify({"error": error}), 400)
+
+    return content, None
+
+
+def prepare_document_context(session_id, content, enable_summarization):
+    """
+    Read the document text (optionally summarized) and open its tables.
+
+    Returns a dict with the summary_text, pages_covered (the page range of
+    the text that goes into the prompt), ingestion progress, and pdf_tables
+    or table_store; pdf_tables is only set for sessions saved before the
+    table store.
+    """
+    pdf_tables = content.get("tables", [])
+    table_store = None if pdf_tables else open_table_store(CONTENT_DIR, session_id)
+
+    # Only the pages needed for the preview (or the summary) are read from
+    # the memory-mapped page store
+    pdf_text, first_page, last_page = load_text(
+        CONTENT_DIR,
+        session_id,
+        content,
+        SUMMARY_SOURCE_CHARS if enable_summarization else PREVIEW_CHARS,
+    )
+    return {
+        "summary_text": summarize_text(pdf_text, enable_summarization),
+        "pages_covered": (
+            {"first": first_page, "last": last_page} if first_page else None
+        ),
+        "ingestion": ingestion_progress(content),
+        "pdf_tables": pdf_tables,
+        "table_store": table_store,
+    }
+
+
+def table_context_for(document, questions):
+    """Only the table rows and columns matching the question(s) go into the prompt."""
+    if document["table_store"]:
+        return document["table_store"].context_for(questions)
+    return " ".join(
+        f"Table {i + 1}:\n{table}" for i, table in enumerate(document["pdf_tables"])
+    )
+
+
+def coverage_note(document):
+    """Tell the model when its text does not span the whole document."""
+    pages = document["pages_covered"]
+    ingestion = document["ingestion"]
+    if not ingestion:
+        return None
+    # Ingestion that stopped for good ("partial") is not "so far"
+    so_far = " so far" if ingestion["status"] == "processing" else ""
+    if pages and (pages["first"] > 1 or pages["last"] < ingestion["total"]):
+        note = (
+            f"Note: the document text below only covers pages {pages['first']}-"
+            f"{pages['last']} of {ingestion['total']}"
+        )
+        if not ingestion["complete"]:
+            note += f" ({ingestion['pages_done']} processed{so_far})"
+    elif not ingestion["complete"]:
+        note = (
+            f"Note: only pages 1-{ingestion['pages_done']} of "
+            f"{ingestion['total']} have been processed{so_far}"
+        )
+    else:
+        return None
+    return f"\n{note}. If the answer may be on another page, say so."
+
+
+def build_prompt(questions, document, table_context):
+    """Build the chat prompt for one question, or a numbered group of them."""
+    # Tell it to respond DIRECTLY without classification labels
+    prompt_parts = [
+        "You are a helpful AI assistant that answers questions about documents.",
+        "",
+        "Instructions:",
+        "- If the user greets you (hi, hello), respond warmly and invite them to ask about the document.",
+        "- If the user thanks you, acknowledge it briefly and offer further help.",
+        "- If the user asks a question related to the document, answer it thoroughly using the provided context.",
+        "- The document text is marked with [Page N]; mention the page numbers your answer is based on.",
+        "- If the user asks something unrelated to the document, politely explain you can only answer questions about the document content.",
+    ]
+    if len(questions) > 1:
+        prompt_parts.append(
+            "- Several numbered questions follow. Answer each one separately and in order. "
+            "Start every answer on a new line with the question's marker, e.g. [Q1], and do not repeat the question."
+        )
+    prompt_parts += [
+        "",
+        "IMPORTANT: Respond naturally and conversationally. Do NOT include labels like 'Classification:', 'Intent:', or 'Category:' in your response. Just provide the answer directly.",
+    ]
+
+    note = coverage_note(document)
+    if note:
+        prompt_parts.append(note)
+
+    # Add context
+    if document["summary_text"]:
+        prompt_parts.append(f"\nDocument Summary:\n{document['summary_text']}")
+    if table_context:
+        prompt_parts.append(f"\nTables:\n{table_context}")
+
+    if len(questions) > 1:
+        prompt_parts.append(f"\nUser Questions:\n{format_questions(questions)}")
+        prompt_parts.append("\nYour Responses:")
+    else:
+        prompt_parts.append(f"\nUser Question: {questions[0]}")
+        prompt_parts.append("\nYour Response:")
+
+    return "\n".join(prompt_parts)
 
 
 @app.route("/chat", methods=["POST"])
@@ -151,47 +699,29 @@ def chat():
 
     try:
         # Load the document content
-        content_path = os.path.join(CONTENT_DIR, f"{session_id}.json")
-        if not os.path.exists(content_path):
-            return jsonify({"error": "No PDF content available"}), 400
-
-        with open(content_path, "r") as f:
-            content = json.load(f)
-
-        pdf_text = content.get("text", "")
-        pdf_tables = content.get("tables", [])
-
-        # Optionally summarize text
-        summary_text = summarize_text(pdf_text, enable_summarization)
-
-        # Prepare tables for inclusion in the prompt
-        table_summaries = [
-            f"Table {i + 1}:\n{table}" for i, table in enumerate(pdf_tables)
-        ]
-
-        # Build prompt - tell it to respond DIRECTLY without classification labels
-        prompt_parts = [
-            "You are a helpful AI assistant that answers questions about documents.",
-            "",
-            "Instructions:",
-            "- If the user greets you (hi, hello), respond warmly and invite them to ask about the document.",
-            "- If the user thanks you, acknowledge it briefly and offer further help.",
-            "- If the user asks a question related to the document, answer it thoroughly using the provided context.",
-            "- If the user asks something unrelated to the document, politely explain you can only answer questions about the document content.",
-            "",
-            "IMPORTANT: Respond naturally and conversationally. Do NOT include labels like 'Classification:', 'Intent:', or 'Category:' in your response. Just provide the answer directly.",
-        ]
-
-        # Add context
-        if summary_text:
-            prompt_parts.append(f"\nDocument Summary:\n{summary_text}")
-        if table_summaries:
-            prompt_parts.append(f"\nTables:\n{' '.join(table_summaries)}")
-
-        prompt_parts.append(f"\nUser Question: {question}")
-        prompt_parts.append("\nYour Response:")
-
-        prompt = "\n".join(prompt_parts)
+        content, error_response = load_chat_session(session_id)
+        if error_response:
+            return error_response
+
+        document = prepare_document_context(session_id, content, enable_summarization)
+        table_store = document["table_store"]
+
+        # Simple cell lookups can optionally be answered locally
+        if table_store and TABLE_LOCAL_ANSWERS:
+            local_answer = table_store.lookup(question)
+            if local_answer:
+                return jsonify(
+                    {
+                        "answer": local_answer[0],
+                        "pages_covered": None,
+                        "ingestion": document["ingestion"],
+                        "source": "table_lookup",
+                    }
+                )
+
+        prompt = build_prompt(
+            [question], document, table_context_for(document, question)
+        )
 
         # Query DeepSeek
         raw_response = query_deepseek(prompt)
@@ -207,19 +737,185 @@ def chat():
         response_dict = json.loads(raw_response)
         processed_answer = process_deepseek_response(response_dict["answer"])
 
-        return jsonify({"answer": processed_answer})
+        return jsonify(
+            {
+                "answer": processed_answer,
+                "pages_covered": document["pages_covered"],
+                "ingestion": document["ingestion"],
+            }
+        )
 
+    except UpstreamOverloaded:
+        raise  # Shed by admission control; answered with 503 + Retry-After
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
         return jsonify({"error": f"Error processing request: {str(e)}"}), 500
 
 
+def answer_questions(questions, indices, document):
+    """
+    Answer questions[i] for each index, grouped into as few upstream
+    requests as the token budget allows.
+
+    Returns ({index: answer or error dict}, upstream request count). Questions
+    a grouped response left unanswered are retried on their own once.
+    """
+    if document["table_store"]:
+        table_tokens = TABLE_CONTEXT_CHARS // 4
+    else:
+        table_tokens = estimate_tokens(table_context_for(document, []))
+    context_tokens = (
+        estimate_tokens(build_prompt(["", ""], document, "")) + table_tokens
+    )
+
+    groups = [
+        [indices[i] for i in group]
+        for group in group_questions([questions[i] for i in indices], context_tokens)
+    ]
+    results = {}
+    requests_sent = 0
+
+    while groups:
+        futures = {}
+        for group in groups:
+            asked = [questions[i] for i in group]
+            prompt = build_prompt(asked, document, table_context_for(document, asked))
+            max_tokens = max(MAX_OUTPUT_TOKENS, BATCH_ANSWER_TOKENS * len(group))
+            future = batch_executor.submit(
+                complete_deepseek, prompt, PRIORITY_BACKGROUND, max_tokens
+            )
+            futures[future] = group
+        requests_sent += len(futures)
+
+        retry = []
+        for future, group in futures.items():
+            try:
+                text = future.result()
+            except UpstreamOverloaded as e:
+                for i in group:
+                    results[i] = {
+                        "error": "The service is busy right now. Please try again shortly.",
+                        "retry_after": e.retry_after,
+                    }
+                continue
+            except Exception as e:
+                print(f"Error in batch chat request: {str(e)}")
+                for i in group:
+                    results[i] = {"error": f"Error processing request: {str(e)}"}
+                continue
+
+            if len(group) == 1:
+                results[group[0]] = {"answer": process_deepseek_response(text)}
+                continue
+            answers = split_answers(text, len(group))
+            for n, i in enumerate(group, 1):
+                if n in answers:
+                    results[i] = {"answer": process_deepseek_response(answers[n])}
+                else:
+                    retry.append([i])
+        groups = retry
+
+    return results, requests_sent
+
+
+@app.route("/chat/batch", methods=["POST"])
+@limiter.limit("10 per minute")
+def chat_batch():
+    """
+    Answer a list of questions about one document.
+
+    The document context is loaded once, questions are grouped into
+    multi-question prompts and groups are sent concurrently. Answers come back
+    in the order asked, each with either "answer" or "error".
+    """
+    data = request.get_json(silent=True) or {}
+    questions = data.get("questions")
+    session_id = data.get("session_id")
+    enable_summarization = data.get("enable_summarization", False)
+
+    if not session_id or not isinstance(questions, list) or not questions:
+        return jsonify({"error": "Missing required parameters"}), 400
+    if len(questions) > MAX_BATCH_QUESTIONS:
+        return (
+            jsonify(
+                {"error": f"Too many questions. Max {MAX_BATCH_QUESTIONS} per batch."}
+            ),
+            400,
+        )
+    questions = [
+        question.strip() if isinstance(question, str) else "" for question in questions
+    ]
+
+    try:
+        content, error_response = load_chat_session(session_id)
+        if error_response:
+            return error_response
+
+        document = prepare_document_context(session_id, content, enable_summarization)
+        table_store = document["table_store"]
+
+        results = {}
+        pending = []
+        for i, question in enumerate(questions):
+            if not question:
+                results[i] = {"error": "Missing question"}
+                continue
+            if table_store and TABLE_LOCAL_ANSWERS:
+                local_answer = table_store.lookup(question)
+                if local_answer:
+                    results[i] = {"answer": local_answer[0], "source": "table_lookup"}
+                    continue
+            pending.append(i)
+
+        requests_sent = 0
+        if pending:
+            answered, requests_sent = answer_questions(questions, pending, document)
+            results.update(answered)
+
+        return jsonify(
+            {
+                "answers": [
+                    dict(results[i], question=question)
+                    for i, question in enumerate(questions)
+                ],
+                "pages_covered": document["pages_covered"],
+                "ingestion": document["ingestion"],
+                "upstream_requests": requests_sent,
+            }
+        )
+
+    except UpstreamOverloaded:
+        raise  # Summarization was shed; answered with 503 + Retry-After
+    except Exception as e:
+        print(f"Error in batch chat endpoint: {str(e)}")
+        return jsonify({"error": f"Error processing request: {str(e)}"}), 500
+
+
+@app.route("/metrics")
+def metrics():
+    """Extraction pool, upstream endpoint, admission control and session store counters."""
+    return jsonify(
+        {
+            "extraction_pool": extraction_pool.stats(),
+            "upstream": provider_pool.stats(),
+            "admission": admission.stats(),
+            "session_store": session_store.stats(),
+        }
+    )
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
 
 if __name__ == "__main__":
+    # Extraction workers must not import this module again (see worker_pool)
+    detach_main_module()
+
+    if WARM_UP:
+        start_warm_up(PORT if ENV == "production" else 5000)
+
     if ENV == "production":
         # Production settings
         app.config["SESSION_COOKIE_SECURE"] = True
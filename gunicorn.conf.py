@@ -0,0 +1,9 @@
+import os
+
+
+def post_worker_init(worker):
+    """Warm up each worker once it has booted; the master already holds the port."""
+    if os.getenv("WARM_UP", "false").lower() == "true":
+        from app import start_warm_up
+
+        start_warm_up()
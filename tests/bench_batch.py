@@ -0,0 +1,170 @@
+"""
+Batch question benchmark: answering N questions with sequential /chat calls
+against one /chat/batch call, with the upstream API replaced by a mock server.
+
+Run from the project root:
+
+    python tests/bench_batch.py [--questions 30] [--delay 0.5] [--per-answer 0.1]
+
+The mock takes --delay seconds per request plus --per-answer seconds per
+question answered, since generation time grows with the output. The rate
+limiter is disabled so only the request path is measured; in production,
+sequential /chat calls are additionally capped at 10 per minute.
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_upstream import MockUpstream  # noqa: E402
+
+TOPICS = ["revenue", "headcount", "risk factors", "guidance", "margins", "capex"]
+
+
+def make_questions(count):
+    return [
+        f"What does the report say about {TOPICS[i % len(TOPICS)]} ({i + 1})?"
+        for i in range(count)
+    ]
+
+
+def mock_answer(per_answer):
+    """Answer every question in the prompt, like the model is asked to."""
+
+    def answer(body):
+        prompt = body["messages"][-1]["content"]
+        asked = re.findall(r"^\[Q(\d+)\] (.*)$", prompt, re.MULTILINE)
+        if not asked:
+            asked = [("", prompt.split("User Question: ", 1)[1].split("\n")[0])]
+        time.sleep(per_answer * len(asked))
+        return "\n".join(
+            f"[Q{n}] Answer to: {question}" if n else f"Answer to: {question}"
+            for n, question in asked
+        )
+
+    return answer
+
+
+def setup_app(upstream_url, workdir):
+    """Import app against the mock upstream with a synthetic session."""
+    os.environ.update(
+        ENV="development",
+        SESSION_STORE="none",
+        WARM_UP="false",
+        EXTRACTION_WORKERS="0",
+        DEEPSEEK_API_URL=upstream_url,
+        DEEPSEEK_API_KEY="bench",
+        UPSTREAM_ENDPOINTS="deepseek",
+        HEDGE_ENABLED="false",
+        UPSTREAM_TOKENS_PER_MINUTE="0",
+        UPSTREAM_LIMIT_STORE=os.path.join(workdir, "limits.db"),
+    )
+    os.chdir(workdir)
+    import app
+
+    app.limiter.enabled = False
+
+    from utils.page_store import append_pages
+    from utils.session_utils import save_content
+
+    session_id = "bench"
+    pages = [
+        (n, f"Page {n} discusses {TOPICS[n % len(TOPICS)]} in detail. " * 20)
+        for n in range(1, 11)
+    ]
+    append_pages(app.CONTENT_DIR, session_id, pages)
+    save_content(
+        app.CONTENT_DIR,
+        session_id,
+        {
+            "text_pages": len(pages),
+            "table_count": 0,
+            "page_count": len(pages),
+            "pages_done": len(pages),
+            "status": "complete",
+        },
+    )
+    return app, session_id
+
+
+def run(count, delay, per_answer, max_group=None):
+    """Return a dict of timings and request counts for both approaches."""
+    questions = make_questions(count)
+    with tempfile.TemporaryDirectory() as workdir, MockUpstream(
+        delay=delay, answer=mock_answer(per_answer)
+    ) as upstream:
+        app, session_id = setup_app(upstream.url, workdir)
+        if max_group:
+            app.group_questions = functools.partial(
+                app.group_questions, max_group=max_group
+            )
+        client = app.app.test_client()
+
+        start = time.perf_counter()
+        sequential = [
+            client.post(
+                "/chat", json={"question": question, "session_id": session_id}
+            ).get_json()["answer"]
+            for question in questions
+        ]
+        sequential_seconds = time.perf_counter() - start
+        sequential_requests = len(upstream.requests)
+
+        start = time.perf_counter()
+        batch = client.post(
+            "/chat/batch", json={"questions": questions, "session_id": session_id}
+        ).get_json()
+        batch_seconds = time.perf_counter() - start
+
+    return {
+        "questions": count,
+        "sequential_seconds": round(sequential_seconds, 3),
+        "sequential_requests": sequential_requests,
+        "batch_seconds": round(batch_seconds, 3),
+        "batch_requests": batch["upstream_requests"],
+        "speedup": round(sequential_seconds / batch_seconds, 2),
+        "answers_match": [a.get("answer") for a in batch["answers"]] == sequential,
+        "in_order": [a["question"] for a in batch["answers"]] == questions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--per-answer", type=float, default=0.1)
+    parser.add_argument(
+        "--max-group", type=int, help="Questions per prompt (1 = concurrent only)"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    result = run(args.questions, args.delay, args.per_answer, args.max_group)
+    if args.json:
+        print(json.dumps(result))
+        return
+
+    print(
+        f"{result['questions']} questions, mock latency {args.delay}s + {args.per_answer}s/answer"
+    )
+    for name in ("sequential", "batch"):
+        seconds = result[f"{name}_seconds"]
+        print(
+            f"{'/chat x N' if name == 'sequential' else '/chat/batch':<12} "
+            f"{seconds:>7.2f} s {result[f'{name}_requests']:>4} upstream requests "
+            f"{result['questions'] / seconds * 60:>8.1f} questions/min"
+        )
+    print(f"speedup {result['speedup']}x, answers match: {result['answers_match']}")
+
+
+if __name__ == "__main__":
+    main()
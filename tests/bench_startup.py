@@ -0,0 +1,123 @@
+"""
+Startup-time benchmark: import time of app.py and time to the first 200 on /.
+
+Run from the project root:
+
+    python tests/bench_startup.py [--runs 5] [--max-import 2.0] [--max-first-response 5.0]
+
+Exits non-zero if a budget is exceeded or a heavy module is imported eagerly,
+so it can be used to catch cold-start regressions.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be loaded on first use
+HEAVY_MODULES = ["fitz", "camelot", "pandas", "googleapiclient"]
+
+IMPORT_SNIPPET = f"""
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+eager = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(elapsed, ",".join(eager))
+"""
+
+
+def bench_env(port=None):
+    env = dict(os.environ, ENV="production", WARM_UP="false")
+    if port:
+        env["PORT"] = str(port)
+    return env
+
+
+def measure_import():
+    """Return (seconds, eagerly imported heavy modules) for `import app`."""
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=bench_env(), text=True
+    )
+    elapsed, _, eager = output.strip().splitlines()[-1].partition(" ")
+    return float(elapsed), [m for m in eager.split(",") if m]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(timeout=60):
+    """Return seconds from process spawn until GET / answers 200."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "app.py"],
+        cwd=ROOT,
+        env=bench_env(port),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/", timeout=1
+                ) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"No 200 on / within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=None)
+    parser.add_argument("--max-first-response", type=float, default=None)
+    args = parser.parse_args()
+
+    import_times, first_responses, eager = [], [], set()
+    for _ in range(args.runs):
+        elapsed, modules = measure_import()
+        import_times.append(elapsed)
+        eager.update(modules)
+        first_responses.append(measure_first_response())
+
+    import_median = statistics.median(import_times)
+    response_median = statistics.median(first_responses)
+    print(
+        f"import app:          median {import_median:.3f}s  (max {max(import_times):.3f}s)"
+    )
+    print(
+        f"first 200 on /:      median {response_median:.3f}s  (max {max(first_responses):.3f}s)"
+    )
+    print(f"eager heavy modules: {', '.join(sorted(eager)) or 'none'}")
+
+    failed = bool(eager)
+    if args.max_import is not None and import_median > args.max_import:
+        print(f"FAIL: import time exceeds {args.max_import}s")
+        failed = True
+    if (
+        args.max_first_response is not None
+        and response_median > args.max_first_response
+    ):
+        print(f"FAIL: time to first response exceeds {args.max_first_response}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
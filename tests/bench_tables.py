@@ -0,0 +1,104 @@
+"""
+Table prompt benchmark: prompt size and build latency of the per-question
+table context from the table store against dumping every table's JSON.
+
+Run from the project root:
+
+    python tests/bench_tables.py [--tables 20] [--rows 60] [--runs 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.table_store import TableStore, append_tables, open_table_store  # noqa: E402
+
+METRICS = ["Revenue", "Operating costs", "Gross margin", "Headcount", "Net income"]
+QUESTIONS = [
+    "What was Q3 revenue?",
+    "How did headcount change between Q1 and Q4?",
+    "What was the gross margin in Q2?",
+    "Summarize net income.",
+]
+
+
+def make_tables(count, rows, seed=7):
+    random.seed(seed)
+    tables = []
+    for t in range(count):
+        records = [{"0": "Metric", "1": "Q1", "2": "Q2", "3": "Q3", "4": "Q4"}]
+        for r in range(rows):
+            label = f"{random.choice(METRICS)} {t}-{r}"
+            record = {"0": label}
+            for col in range(1, 5):
+                record[str(col)] = f"{random.randint(100, 99999):,}"
+            records.append(record)
+        tables.append(json.dumps(records))
+    return tables
+
+
+def legacy_context(content_path):
+    """What /chat did before the table store: load JSON, dump every table."""
+    with open(content_path, "r") as f:
+        tables = json.load(f)["tables"]
+    return " ".join(f"Table {i + 1}:\n{table}" for i, table in enumerate(tables))
+
+
+def store_context(content_dir, question, cached):
+    if cached:
+        return open_table_store(content_dir, "bench").context_for(question)
+    return TableStore(content_dir, "bench").context_for(question)
+
+
+def timed(func, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    tables = make_tables(args.tables, args.rows)
+    with tempfile.TemporaryDirectory() as content_dir:
+        content_path = os.path.join(content_dir, "legacy.json")
+        with open(content_path, "w") as f:
+            json.dump({"tables": tables}, f)
+        append_tables(content_dir, "bench", tables)
+
+        legacy, legacy_ms = timed(lambda: legacy_context(content_path), args.runs)
+        print(f"{args.tables} tables x {args.rows} rows")
+        print(
+            f"{'all tables (before)':<48} {len(legacy):>8} chars "
+            f"~{len(legacy) // 4:>6} tokens {legacy_ms:>7.2f} ms"
+        )
+        for question in QUESTIONS:
+            context, cold_ms = timed(
+                lambda: store_context(content_dir, question, False), args.runs
+            )
+            _, warm_ms = timed(
+                lambda: store_context(content_dir, question, True), args.runs
+            )
+            print(
+                f"{question:<48} {len(context):>8} chars "
+                f"~{len(context) // 4:>6} tokens {cold_ms:>7.2f} ms "
+                f"({warm_ms:.2f} ms with cached index)"
+            )
+
+
+if __name__ == "__main__":
+    main()
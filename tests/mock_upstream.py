@@ -0,0 +1,64 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockUpstream:
+    """
+    Local stand-in for an OpenAI-compatible chat completions endpoint.
+
+    Usage:
+        with MockUpstream(delay=0.5) as server:
+            requests.post(server.url, json={...})
+    """
+
+    def __init__(self, delay=0.0, status=200, answer="Mock answer"):
+        self.delay = delay
+        self.status = status
+        self.answer = answer
+        self.requests = []
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/chat/completions"
+
+    def __enter__(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                mock.requests.append(body)
+                time.sleep(mock.delay)
+
+                if mock.status != 200:
+                    payload = {"error": {"message": "mock failure"}}
+                else:
+                    answer = mock.answer(body) if callable(mock.answer) else mock.answer
+                    payload = {"choices": [{"message": {"content": answer}}]}
+
+                data = json.dumps(payload).encode()
+                self.send_response(mock.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client hung up, e.g. a cancelled hedge
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
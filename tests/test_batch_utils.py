@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+from utils.batch_utils import format_questions, group_questions, split_answers
+
+BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_batch.py")
+
+
+def test_groups_respect_token_budget_and_group_size():
+    questions = ["x" * 400] * 5  # 100 tokens each, plus 50 for the answer
+    assert group_questions(questions, 100, prompt_tokens=420, answer_tokens=50) == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+    assert group_questions(questions, 0, answer_tokens=0, max_group=3) == [
+        [0, 1, 2],
+        [3, 4],
+    ]
+    # A question too large for the budget still gets its own group
+    assert group_questions(["x" * 8000], 100, prompt_tokens=500) == [[0]]
+
+
+def test_answers_are_split_on_markers():
+    prompt_block = format_questions(["First?", "Second?", "Third?"])
+    assert prompt_block == "[Q1] First?\n[Q2] Second?\n[Q3] Third?"
+
+    text = "**[Q1]** One,\nover two lines.\n[Q3]: Three\n[Q7] Out of range\n[Q2]"
+    assert split_answers(text, 3) == {1: "One,\nover two lines.", 3: "Three"}
+    assert split_answers("No markers at all", 2) == {}
+
+
+def test_batch_endpoint_against_mock_upstream():
+    output = subprocess.check_output(
+        [sys.executable, BENCH, "--questions", "12", "--delay", "0", "--json"],
+        text=True,
+    )
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result["in_order"] and result["answers_match"]
+    assert result["sequential_requests"] == 12
+    assert result["batch_requests"] == 2  # Groups of up to BATCH_MAX_GROUP=8
@@ -0,0 +1,162 @@
+import importlib
+import json
+import os
+
+import pytest
+
+from utils.page_store import PageReader
+from utils.session_store import LocalDirectoryBackend, SessionStore
+from utils.session_utils import load_content
+from utils.worker_pool import ExtractionError
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class DroppingExecutor:
+    def submit(self, fn, *args):
+        pass
+
+
+def extract_six_pages(name, path, first_page=None, last_page=None, priority=None):
+    """Stand-in for the extraction pool: six pages of text, no tables."""
+    if name == "get_page_count":
+        return 6
+    if name == "extract_pdf_tables":
+        return []
+    return [(n, f"Text of page {n}") for n in range(first_page, last_page + 1)]
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # CONTENT_DIR is relative
+    for name, value in {
+        "ENV": "development",
+        "SESSION_STORE": "none",
+        "EXTRACTION_WORKERS": "0",
+        "UPSTREAM_LIMIT_STORE": str(tmp_path / "limits.db"),
+    }.items():
+        monkeypatch.setenv(name, value)
+    app = importlib.import_module("app")
+    (tmp_path / app.CONTENT_DIR).mkdir(exist_ok=True)
+    (tmp_path / app.UPLOAD_DIR).mkdir(exist_ok=True)
+    monkeypatch.setattr(app, "ingest_executor", InlineExecutor())
+    monkeypatch.setattr(app, "PROGRESSIVE_FIRST_PAGES", 2)
+    monkeypatch.setattr(app, "PROGRESSIVE_BATCH_PAGES", 2)
+    return app
+
+
+def test_failed_table_jobs_keep_the_text(app_module, tmp_path, monkeypatch):
+    def run(name, path, first_page=None, last_page=None, priority=None):
+        if name == "get_page_count":
+            return 6
+        if name == "extract_pdf_tables" and first_page in (1, 3):
+            raise ExtractionError("Extraction timed out after 120s")
+        if name == "extract_pdf_tables":
+            return []
+        return [(n, f"Text of page {n}") for n in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr(app_module.extraction_pool, "run", run)
+    pdf_path = tmp_path / "upload.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+
+    session_id, _ = app_module.ingest_pdf(str(pdf_path))
+
+    content = load_content(app_module.CONTENT_DIR, session_id)
+    assert content["status"] == "complete"
+    assert content["pages_done"] == 6
+    assert [
+        (error["job"], error["first_page"], error["last_page"])
+        for error in content["extraction_errors"]
+    ] == [("extract_pdf_tables", 1, 2), ("extract_pdf_tables", 3, 4)]
+    with PageReader(app_module.CONTENT_DIR, session_id) as pages:
+        assert pages.page_numbers() == [1, 2, 3, 4, 5, 6]
+    assert not pdf_path.exists()
+
+
+def test_session_is_archived_before_upload_returns(app_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module.extraction_pool, "run", extract_six_pages)
+    store = SessionStore(
+        app_module.CONTENT_DIR, LocalDirectoryBackend(str(tmp_path / "shared"))
+    )
+    monkeypatch.setattr(app_module, "session_store", store)
+    queued = []
+    monkeypatch.setattr(
+        app_module.ingest_executor, "submit", lambda *args: queued.append(args)
+    )
+    pdf_path = tmp_path / "upload.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+
+    session_id, _ = app_module.ingest_pdf(str(pdf_path))
+
+    # The background batches have not started, but another node can already
+    # serve the first pages
+    assert queued
+    other_node = SessionStore(str(tmp_path / "other"), store.backend)
+    os.makedirs(other_node.content_dir)
+    assert other_node.ensure_local(session_id)
+    assert load_content(other_node.content_dir, session_id)["pages_done"] == 2
+    assert (tmp_path / "shared" / f"{session_id}.source.pdf").exists()
+
+    # Each background batch is archived as it completes
+    archived = []
+    monkeypatch.setattr(
+        store,
+        "archive",
+        lambda sid: archived.append(
+            load_content(app_module.CONTENT_DIR, sid)["pages_done"]
+        ),
+    )
+    queued[0][0](*queued[0][1:])
+    assert archived == [4, 6]
+
+
+def orphan_session(app_module, tmp_path, monkeypatch):
+    """Upload a PDF whose background ingestion never runs, as if the process died."""
+    monkeypatch.setattr(app_module.extraction_pool, "run", extract_six_pages)
+    monkeypatch.setattr(app_module, "ingest_executor", DroppingExecutor())
+    pdf_path = tmp_path / "upload.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+    session_id, _ = app_module.ingest_pdf(str(pdf_path))
+    monkeypatch.setattr(app_module, "ingest_executor", InlineExecutor())
+
+    # Backdate the heartbeat without save_content, which would refresh it
+    path = os.path.join(app_module.CONTENT_DIR, f"{session_id}.json")
+    with open(path) as f:
+        content = json.load(f)
+    content["updated_at"] -= app_module.INGEST_STALE_SECONDS + 1
+    with open(path, "w") as f:
+        json.dump(content, f)
+    return session_id
+
+
+def test_stalled_ingestion_resumes_from_archived_pdf(app_module, tmp_path, monkeypatch):
+    store = SessionStore(
+        app_module.CONTENT_DIR, LocalDirectoryBackend(str(tmp_path / "shared"))
+    )
+    monkeypatch.setattr(app_module, "session_store", store)
+    session_id = orphan_session(app_module, tmp_path, monkeypatch)
+
+    content, error_response = app_module.load_chat_session(session_id)
+
+    assert error_response is None
+    assert content["status"] == "complete"
+    assert content["pages_done"] == 6
+    with PageReader(app_module.CONTENT_DIR, session_id) as pages:
+        assert pages.page_numbers() == [1, 2, 3, 4, 5, 6]
+
+
+def test_stalled_ingestion_without_pdf_is_marked_partial(
+    app_module, tmp_path, monkeypatch
+):
+    session_id = orphan_session(app_module, tmp_path, monkeypatch)
+
+    content, _ = app_module.load_chat_session(session_id)
+
+    assert content["status"] == "partial"
+    assert content["error"] == "Processing stopped after page 2 of 6"
+    assert not app_module.ingestion_stalled(
+        app_module.CONTENT_DIR, session_id, content, 0
+    )
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from utils.limit_utils import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    AdmissionController,
+    UpstreamOverloaded,
+)
+
+
+def make_controller(tmp_path, **kwargs):
+    options = {
+        "max_in_flight": 1,
+        "tokens_per_minute": 0,
+        "max_queue_size": 4,
+        "queue_timeouts": {PRIORITY_INTERACTIVE: 2, PRIORITY_BACKGROUND: 2},
+    }
+    options.update(kwargs)
+    return AdmissionController(path=str(tmp_path / "limits.db"), **options)
+
+
+def wait_for_queue(controller, size):
+    while controller.stats()["queued"] < size:
+        time.sleep(0.01)
+
+
+def test_limits_in_flight_calls(tmp_path):
+    controller = make_controller(tmp_path, queue_timeouts={PRIORITY_INTERACTIVE: 0.2})
+    with controller.slot():
+        with pytest.raises(UpstreamOverloaded):
+            controller.acquire()
+    # Slot released, so the next call is admitted straight away
+    controller.release(controller.acquire())
+
+
+def test_state_is_shared_between_controllers(tmp_path):
+    first = make_controller(tmp_path)
+    second = make_controller(tmp_path, queue_timeouts={PRIORITY_INTERACTIVE: 0.2})
+    with first.slot():
+        assert second.stats()["in_flight"] == 1
+        with pytest.raises(UpstreamOverloaded):
+            second.acquire()
+
+
+def test_full_queue_is_shed_with_retry_after(tmp_path):
+    controller = make_controller(tmp_path, max_queue_size=1)
+    holder = controller.acquire()
+    waiter = threading.Thread(target=lambda: controller.release(controller.acquire()))
+    waiter.start()
+    wait_for_queue(controller, 1)
+
+    with pytest.raises(UpstreamOverloaded) as error:
+        controller.acquire()
+    assert error.value.retry_after >= 1
+
+    controller.release(holder)
+    waiter.join()
+
+
+def test_interactive_calls_jump_background_queue(tmp_path):
+    controller = make_controller(tmp_path)
+    order = []
+
+    def call(priority, name):
+        with controller.slot(priority):
+            order.append(name)
+
+    holder = controller.acquire()
+    background = threading.Thread(target=call, args=(PRIORITY_BACKGROUND, "background"))
+    background.start()
+    wait_for_queue(controller, 1)
+    interactive = threading.Thread(
+        target=call, args=(PRIORITY_INTERACTIVE, "interactive")
+    )
+    interactive.start()
+    wait_for_queue(controller, 2)
+
+    controller.release(holder)
+    background.join()
+    interactive.join()
+    assert order == ["interactive", "background"]
+
+
+def test_tokens_per_minute_budget(tmp_path):
+    controller = make_controller(
+        tmp_path,
+        max_in_flight=10,
+        tokens_per_minute=1000,
+        queue_timeouts={PRIORITY_INTERACTIVE: 0.2},
+    )
+    controller.release(controller.acquire(tokens=800))
+    with pytest.raises(UpstreamOverloaded) as error:
+        controller.acquire(tokens=500)
+    assert error.value.retry_after > 1
+
+
+def test_try_acquire_does_not_wait(tmp_path):
+    controller = make_controller(tmp_path)
+    ticket = controller.try_acquire()
+    assert ticket
+    assert controller.try_acquire() is None  # Full, and nothing is left queued
+    assert controller.stats()["queued"] == 0
+    controller.release(ticket)
+    controller.release(controller.try_acquire())
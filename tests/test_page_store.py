@@ -0,0 +1,38 @@
+from utils.page_store import PageReader, append_pages, has_pages
+
+
+def test_pages_round_trip_and_slice_lazily(tmp_path):
+    content_dir = str(tmp_path)
+    append_pages(
+        content_dir, "s1", [(1, "First page"), (2, ""), (3, "Third – ünïcode")]
+    )
+    append_pages(content_dir, "s1", [(4, "Fourth page")])
+
+    assert has_pages(content_dir, "s1")
+    with PageReader(content_dir, "s1") as pages:
+        assert len(pages) == 3  # Empty pages are not stored
+        assert pages.page_numbers() == [1, 3, 4]
+        assert pages.page(3) == "Third – ünïcode"
+        assert pages.page(2) is None
+        assert list(pages.iter_pages(3, 3)) == [(3, "Third – ünïcode")]
+
+        text, first_page, last_page = pages.text(max_chars=30)
+        assert len(text) <= 30
+        assert text.startswith("[Page 1]\nFirst page")
+        assert (first_page, last_page) == (1, 3)
+
+
+def test_reader_ignores_partially_written_index(tmp_path):
+    content_dir = str(tmp_path)
+    append_pages(content_dir, "s1", [(1, "Only page")])
+    with open(tmp_path / "s1.pages.idx", "ab") as index:
+        index.write(b"\x02\x00")  # A record still being written
+
+    with PageReader(content_dir, "s1") as pages:
+        assert pages.page_numbers() == [1]
+
+
+def test_missing_session_reads_as_empty(tmp_path):
+    with PageReader(str(tmp_path), "missing") as pages:
+        assert len(pages) == 0
+        assert pages.text() == ("", None, None)
@@ -0,0 +1,150 @@
+import time
+
+import pytest
+
+from mock_upstream import MockUpstream
+from utils import provider_utils
+from utils.provider_utils import Endpoint, EndpointPool, ProviderError
+
+
+def make_pool(*servers, hedge=True):
+    endpoints = [
+        Endpoint(f"mock{i}", server.url, "test-key") for i, server in enumerate(servers)
+    ]
+    return EndpointPool(endpoints, hedge=hedge)
+
+
+def payload():
+    return {"model": "deepseek-chat", "messages": [{"role": "user", "content": "hi"}]}
+
+
+def answer(result):
+    return result["choices"][0]["message"]["content"]
+
+
+def test_primary_answers_without_hedging():
+    with MockUpstream(answer="primary") as primary, MockUpstream(
+        answer="secondary"
+    ) as secondary:
+        pool = make_pool(primary, secondary)
+        assert answer(pool.post(payload())) == "primary"
+        assert pool.hedged_requests == 0
+        assert len(secondary.requests) == 0
+
+
+def test_slow_primary_is_hedged(monkeypatch):
+    monkeypatch.setattr(provider_utils, "HEDGE_DEFAULT_DELAY", 0.2)
+    monkeypatch.setattr(provider_utils, "HEDGE_MIN_DELAY", 0.1)
+    with MockUpstream(delay=2, answer="primary") as primary, MockUpstream(
+        answer="secondary"
+    ) as secondary:
+        pool = make_pool(primary, secondary)
+        start = time.monotonic()
+        assert answer(pool.post(payload())) == "secondary"
+        assert time.monotonic() - start < 1.5
+        assert pool.hedged_requests == 1
+
+
+def test_hedge_delay_adapts_to_p95(monkeypatch):
+    monkeypatch.setattr(provider_utils, "HEDGE_MIN_DELAY", 0.0)
+    endpoint = Endpoint("mock", "http://unused", "key")
+    for _ in range(provider_utils.HEDGE_MIN_SAMPLES):
+        endpoint.record_success(0.5)
+    pool = EndpointPool([endpoint])
+    assert pool.hedge_delay(endpoint) == pytest.approx(0.5)
+
+
+def test_hedge_delay_is_tracked_per_model(monkeypatch):
+    monkeypatch.setattr(provider_utils, "HEDGE_MIN_DELAY", 0.0)
+    monkeypatch.setattr(provider_utils, "HEDGE_MAX_DELAY", 60.0)
+    endpoint = Endpoint("mock", "http://unused", "key")
+    for _ in range(provider_utils.HEDGE_MIN_SAMPLES):
+        endpoint.record_success(0.5, "deepseek-chat")
+        endpoint.record_success(40.0, "deepseek-reasoner")
+    pool = EndpointPool([endpoint])
+    assert pool.hedge_delay(endpoint, "deepseek-chat") == pytest.approx(0.5)
+    assert pool.hedge_delay(endpoint, "deepseek-reasoner") == pytest.approx(40.0)
+    assert endpoint.stats()["p95_seconds"] == {
+        "deepseek-chat": 0.5,
+        "deepseek-reasoner": 40.0,
+    }
+
+
+def test_failover_on_error():
+    with MockUpstream(status=500) as primary, MockUpstream(
+        answer="secondary"
+    ) as secondary:
+        pool = make_pool(primary, secondary, hedge=False)
+        assert answer(pool.post(payload())) == "secondary"
+        assert pool.endpoints[0].failures == 1
+
+
+def test_failing_endpoint_is_demoted():
+    with MockUpstream(status=503) as primary, MockUpstream(
+        answer="secondary"
+    ) as secondary:
+        pool = make_pool(primary, secondary, hedge=False)
+        for _ in range(provider_utils.MAX_CONSECUTIVE_FAILURES):
+            pool.post(payload())
+        assert not pool.endpoints[0].is_healthy()
+
+        primary.requests.clear()
+        pool.post(payload())
+        assert pool.ordered_endpoints()[0].name == "mock1"
+        assert len(primary.requests) == 0
+
+
+def test_all_endpoints_failing_raises():
+    with MockUpstream(status=500) as primary, MockUpstream(status=502) as secondary:
+        pool = make_pool(primary, secondary)
+        with pytest.raises(ProviderError):
+            pool.post(payload())
+
+
+def test_hedged_loser_latency_is_recorded(monkeypatch):
+    monkeypatch.setattr(provider_utils, "HEDGE_DEFAULT_DELAY", 0.1)
+    monkeypatch.setattr(provider_utils, "HEDGE_MIN_DELAY", 0.1)
+    with MockUpstream(delay=0.6) as primary, MockUpstream() as secondary:
+        pool = make_pool(primary, secondary)
+        for _ in range(3):
+            pool.post(payload())
+        latencies = pool.endpoints[0]._latencies
+        deadline = time.monotonic() + 5
+        while (
+            len(latencies.get("deepseek-chat", ())) < 3 and time.monotonic() < deadline
+        ):
+            time.sleep(0.05)  # Losers finish after post() has returned
+        assert len(latencies["deepseek-chat"]) == 3
+        assert min(latencies["deepseek-chat"]) >= 0.6
+
+
+def test_attempts_take_admission_slots(tmp_path, monkeypatch):
+    from utils.limit_utils import AdmissionController
+
+    monkeypatch.setattr(provider_utils, "HEDGE_DEFAULT_DELAY", 0.1)
+    monkeypatch.setattr(provider_utils, "HEDGE_MIN_DELAY", 0.1)
+
+    def controller(max_in_flight):
+        return AdmissionController(
+            path=str(tmp_path / f"limits{max_in_flight}.db"),
+            max_in_flight=max_in_flight,
+            tokens_per_minute=0,
+        )
+
+    with MockUpstream(delay=0.5, answer="primary") as primary, MockUpstream(
+        answer="secondary"
+    ) as secondary:
+        # No free slot: the slow primary is not hedged
+        pool = make_pool(primary, secondary)
+        pool.admission = controller(1)
+        assert answer(pool.post(payload())) == "primary"
+        assert pool.skipped_hedges == 1 and pool.hedged_requests == 0
+        assert len(secondary.requests) == 0
+
+        # The hedge wins, but the loser keeps its slot until it has finished
+        pool = make_pool(primary, secondary)
+        pool.admission = controller(2)
+        assert answer(pool.post(payload())) == "secondary"
+        assert pool.admission.stats()["in_flight"] == 1
+        time.sleep(0.6)
+        assert pool.admission.stats()["in_flight"] == 0
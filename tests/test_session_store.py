@@ -0,0 +1,117 @@
+import json
+import os
+import uuid
+
+from utils import session_store as session_store_module
+from utils.page_store import append_pages
+from utils.session_store import LocalDirectoryBackend, SessionStore
+from utils.session_utils import load_content, load_text, save_content
+from utils.table_store import append_tables, open_table_store
+
+TABLE = json.dumps(
+    [
+        {"0": "Quarter", "1": "Revenue"},
+        {"0": "Q1", "1": "1,200"},
+        {"0": "Q2", "1": "1,350"},
+    ]
+)
+
+
+def make_nodes(tmp_path, rebuild=None):
+    """Two nodes with their own content directories sharing one backend."""
+    backend = LocalDirectoryBackend(str(tmp_path / "shared"))
+    nodes = []
+    for name in ("a", "b"):
+        content_dir = tmp_path / name
+        content_dir.mkdir()
+        nodes.append(SessionStore(str(content_dir), backend, rebuild=rebuild))
+    return nodes
+
+
+def create_session(store, session_id, status="complete"):
+    append_pages(store.content_dir, session_id, [(1, "Revenue grew in Q2.")])
+    append_tables(store.content_dir, session_id, [TABLE])
+    save_content(
+        store.content_dir,
+        session_id,
+        {
+            "text_pages": 1,
+            "table_count": 1,
+            "page_count": 1,
+            "pages_done": 1,
+            "status": status,
+        },
+    )
+
+
+def test_other_node_fetches_archived_artifacts(tmp_path):
+    node_a, node_b = make_nodes(tmp_path)
+    session_id = str(uuid.uuid4())
+    create_session(node_a, session_id)
+    assert node_a.archive(session_id)
+
+    assert node_b.ensure_local(session_id)
+    content = load_content(node_b.content_dir, session_id)
+    assert content["status"] == "complete"
+    assert load_text(node_b.content_dir, session_id, content) == (
+        "[Page 1]\nRevenue grew in Q2.",
+        1,
+        1,
+    )
+    table_store = open_table_store(node_b.content_dir, session_id)
+    assert "1,350" in table_store.context_for("Q2 revenue")
+
+    assert node_b.ensure_local(session_id)  # Served from the local cache now
+    assert node_b.stats()["artifact_fetches"] == 1
+    assert node_b.stats()["local_hits"] == 1
+
+
+def test_missing_artifacts_are_rebuilt_from_source_pdf(tmp_path):
+    rebuilt = []
+
+    def rebuild(session_id, pdf_path):
+        with open(pdf_path, "rb") as f:
+            rebuilt.append(f.read())
+        os.remove(pdf_path)
+        create_session(node_b, session_id, status="processing")
+
+    node_a, node_b = make_nodes(tmp_path, rebuild=rebuild)
+    session_id = str(uuid.uuid4())
+    pdf_path = tmp_path / "source.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+    assert node_a.archive_source(session_id, str(pdf_path))
+
+    assert node_b.ensure_local(session_id)
+    assert rebuilt == [b"%PDF-1.4 test"]
+    assert node_b.stats()["rebuilds"] == 1
+
+
+def test_processing_copy_is_refreshed(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store_module, "SESSION_REFRESH_SECONDS", 0)
+    node_a, node_b = make_nodes(tmp_path)
+    session_id = str(uuid.uuid4())
+    create_session(node_a, session_id, status="processing")
+    node_a.archive(session_id)
+    assert node_b.ensure_local(session_id)
+
+    content = load_content(node_a.content_dir, session_id)
+    content["status"] = "complete"
+    save_content(node_a.content_dir, session_id, content)
+    node_a.archive(session_id)
+
+    # Another worker process on node b, which did not do the first fetch
+    node_b_worker = SessionStore(node_b.content_dir, node_b.backend)
+    assert node_b_worker.ensure_local(session_id)
+    assert load_content(node_b.content_dir, session_id)["status"] == "complete"
+    assert node_b_worker.stats()["refreshes"] == 1
+
+    assert node_b.ensure_local(session_id)
+    assert node_b.stats()["refreshes"] == 0  # Complete now, nothing to refresh
+
+
+def test_unknown_or_invalid_sessions_are_misses(tmp_path):
+    node_a, node_b = make_nodes(tmp_path)
+    assert not node_b.ensure_local(str(uuid.uuid4()))
+    assert not node_b.ensure_local("../shared/x")
+    assert node_b.stats()["misses"] == 1
+    assert not os.listdir(node_b.content_dir)  # No leftovers from the attempts
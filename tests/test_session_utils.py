@@ -0,0 +1,24 @@
+from utils.page_store import append_pages
+from utils.session_utils import ingestion_progress, load_text
+
+
+def test_load_text_reports_pages_included(tmp_path):
+    content_dir = str(tmp_path)
+    append_pages(content_dir, "s1", [(n, "x" * 900) for n in range(1, 11)])
+    content = {"page_count": 10, "pages_done": 10, "status": "complete"}
+
+    text, first_page, last_page = load_text(content_dir, "s1", content, 2000)
+    assert (first_page, last_page) == (1, 3)
+    assert "[Page 3]" in text and "[Page 4]" not in text
+    assert ingestion_progress(content) == {
+        "pages_done": 10,
+        "total": 10,
+        "complete": True,
+        "status": "complete",
+    }
+
+
+def test_inline_text_has_no_page_range(tmp_path):
+    content = {"text": "Legacy session text"}
+    assert load_text(str(tmp_path), "s1", content, 6) == ("Legacy", None, None)
+    assert ingestion_progress(content) is None
@@ -0,0 +1,6 @@
+from bench_startup import measure_import
+
+
+def test_heavy_modules_are_imported_lazily():
+    _, eager = measure_import()
+    assert eager == []
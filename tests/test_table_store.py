@@ -0,0 +1,69 @@
+import json
+
+from utils.table_store import TableStore, append_tables, parse_number, tokenize
+
+REVENUE_TABLE = json.dumps(
+    [
+        {"0": "Metric", "1": "Q1", "2": "Q2", "3": "Q3"},
+        {"0": "Revenue", "1": "1,200", "2": "1,350", "3": "1,480"},
+        {"0": "Operating costs", "1": "800", "2": "(820)", "3": "845"},
+        {"0": "Headcount", "1": "40", "2": "42", "3": "45"},
+    ]
+)
+REGION_TABLE = json.dumps(
+    [
+        {"0": "Region", "1": "Share"},
+        {"0": "Europe", "1": "40%"},
+        {"0": "Asia", "1": "35%"},
+    ]
+)
+
+
+def make_store(tmp_path):
+    assert append_tables(str(tmp_path), "s1", [REVENUE_TABLE]) == 1
+    # Tables from later pages are appended to the same store
+    assert append_tables(str(tmp_path), "s1", [REGION_TABLE, "[]"]) == 1
+    return TableStore(str(tmp_path), "s1")
+
+
+def test_parse_number_and_tokenize():
+    assert parse_number("1,200") == 1200
+    assert parse_number("(820)") == -820
+    assert parse_number("$5.5") == 5.5
+    assert parse_number("40%") == 40
+    assert parse_number("Q3") is None
+    assert tokenize("What was Q3 revenue of 1,480?") == ["q3", "revenue", "1480"]
+
+
+def test_headers_are_normalized_and_cells_typed(tmp_path):
+    store = make_store(tmp_path)
+    assert len(store) == 2
+    assert store.tables[0]["headers"] == ["Metric", "Q1", "Q2", "Q3"]
+    assert store.tables[0]["rows"] == 3
+    assert store.cell(0, 0, 3) == "1,480"
+    assert store.number(0, 1, 2) == -820
+    assert store.number(0, 0, 0) is None
+
+
+def test_context_includes_only_matching_rows_and_columns(tmp_path):
+    store = make_store(tmp_path)
+    context = store.context_for("What was Q3 revenue?")
+    assert "Revenue | 1,480" in context
+    assert "Metric | Q3" in context
+    assert "Headcount" not in context
+    assert "Europe" not in context
+
+
+def test_context_falls_back_to_overview(tmp_path):
+    store = make_store(tmp_path)
+    context = store.context_for("Tell me about this document")
+    assert "Table 1:" in context and "Table 2:" in context
+
+
+def test_simple_lookup_is_answered_locally(tmp_path):
+    store = make_store(tmp_path)
+    answer, table_id = store.lookup("what was Q3 revenue")
+    assert answer == "Revenue, Q3: 1,480 (Table 1)"
+    assert table_id == 0
+    # Ambiguous: no single column matched
+    assert store.lookup("revenue trend") is None
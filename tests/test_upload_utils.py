@@ -0,0 +1,112 @@
+import hashlib
+import io
+import multiprocessing
+import time
+
+import pytest
+
+from utils import upload_utils
+from utils.upload_utils import (
+    UploadError,
+    finalize_upload,
+    get_upload,
+    init_upload,
+    write_chunk,
+)
+
+PDF_BYTES = b"%PDF-1.7\n" + b"0123456789" * 100 + b"\n%%EOF"
+
+
+def put(upload_dir, upload_id, offset, data):
+    return write_chunk(upload_dir, upload_id, offset, io.BytesIO(data), len(data))
+
+
+def test_chunks_resume_and_finalize(tmp_path):
+    upload = init_upload(str(tmp_path), "report.pdf", len(PDF_BYTES))
+    upload_id = upload["upload_id"]
+
+    assert put(str(tmp_path), upload_id, 0, PDF_BYTES[:300]) == 300
+    # A retried chunk at a stale offset reports where to resume
+    with pytest.raises(UploadError) as error:
+        put(str(tmp_path), upload_id, 0, PDF_BYTES[:300])
+    assert error.value.status == 409
+    assert error.value.details["offset"] == 300
+
+    # Resuming from another process rebuilds the running hash from disk
+    upload_utils._hashers.clear()
+    assert get_upload(str(tmp_path), upload_id)["offset"] == 300
+    put(str(tmp_path), upload_id, 300, PDF_BYTES[300:])
+
+    pdf_path, filename, sha256 = finalize_upload(
+        str(tmp_path), upload_id, hashlib.sha256(PDF_BYTES).hexdigest()
+    )
+    assert filename == "report.pdf"
+    assert sha256 == hashlib.sha256(PDF_BYTES).hexdigest()
+    with open(pdf_path, "rb") as f:
+        assert f.read() == PDF_BYTES
+
+
+def test_non_pdf_is_rejected_on_first_bytes(tmp_path):
+    upload_id = init_upload(str(tmp_path), "fake.pdf", 100)["upload_id"]
+    with pytest.raises(UploadError):
+        put(str(tmp_path), upload_id, 0, b"GIF89a")
+    with pytest.raises(UploadError) as error:
+        get_upload(str(tmp_path), upload_id)
+    assert error.value.status == 404
+
+
+def test_incomplete_or_corrupt_upload_is_not_finalized(tmp_path):
+    upload_id = init_upload(str(tmp_path), "report.pdf", len(PDF_BYTES))["upload_id"]
+    put(str(tmp_path), upload_id, 0, PDF_BYTES[:10])
+    with pytest.raises(UploadError) as error:
+        finalize_upload(str(tmp_path), upload_id)
+    assert error.value.status == 409
+
+    put(str(tmp_path), upload_id, 10, PDF_BYTES[10:])
+    with pytest.raises(UploadError):
+        finalize_upload(str(tmp_path), upload_id, "0" * 64)
+
+
+class SlowStream(io.BytesIO):
+    """A request body that trickles in, so concurrent writers overlap."""
+
+    def read(self, size=-1):
+        time.sleep(0.05)
+        return super().read(min(size, 100))
+
+
+def put_from_process(upload_dir, upload_id, results):
+    data = PDF_BYTES[:500]
+    try:
+        write_chunk(upload_dir, upload_id, 0, SlowStream(data), len(data))
+        results.put("ok")
+    except UploadError as e:
+        results.put(e.status)
+
+
+def test_same_chunk_from_two_processes_is_written_once(tmp_path):
+    upload_id = init_upload(str(tmp_path), "report.pdf", len(PDF_BYTES))["upload_id"]
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=put_from_process, args=(str(tmp_path), upload_id, results)
+        )
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    assert sorted([results.get(), results.get()], key=str) == [409, "ok"]
+    assert get_upload(str(tmp_path), upload_id)["offset"] == 500
+
+
+def test_cleanup_forgets_hashes_of_removed_uploads(tmp_path):
+    upload_id = init_upload(str(tmp_path), "report.pdf", len(PDF_BYTES))["upload_id"]
+    put(str(tmp_path), upload_id, 0, PDF_BYTES[:100])
+    assert upload_id in upload_utils._hashers
+
+    upload_utils.cleanup_stale_uploads(str(tmp_path), max_age=-1)
+    assert upload_id not in upload_utils._hashers
@@ -0,0 +1,208 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from utils.limit_utils import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from utils.worker_pool import ExtractionError, ExtractionPool
+
+# Jobs run in spawned workers, which import this module by name
+
+
+def add(a, b):
+    return a + b
+
+
+def pid():
+    return os.getpid()
+
+
+def hang():
+    time.sleep(60)
+
+
+def crash():
+    os._exit(1)
+
+
+def grow():
+    hog = bytearray(512 * 1024 * 1024)
+    hog[::4096] = b"x" * len(hog[::4096])  # Touch every page so RSS grows
+    time.sleep(60)
+
+
+def nap(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def fail():
+    raise ValueError("bad input")
+
+
+@pytest.fixture
+def pool():
+    pool = ExtractionPool(
+        size=1,
+        job_timeout=5,
+        max_jobs=100,
+        rss_limit_mb=256,
+        module_name=__name__,
+        initializer=None,
+    )
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_jobs_in_a_subprocess(pool):
+    assert pool.run("add", 2, 3) == 5
+    assert pool.run("pid") != os.getpid()
+    assert pool.stats()["jobs_completed"] == 2
+
+
+def test_job_errors_keep_the_worker(pool):
+    worker_pid = pool.run("pid")
+    with pytest.raises(ExtractionError, match="bad input"):
+        pool.run("fail")
+    assert pool.run("pid") == worker_pid
+
+
+def test_timeout_kills_and_replaces_worker(pool):
+    worker_pid = pool.run("pid")
+    with pytest.raises(ExtractionError, match="timed out"):
+        pool.run("hang", timeout=0.5)
+    assert pool.run("pid") != worker_pid
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["worker_restarts"] == 1
+
+
+def test_crash_is_a_clean_error(pool):
+    with pytest.raises(ExtractionError, match="crashed"):
+        pool.run("crash")
+    assert pool.run("add", 1, 1) == 2
+    assert pool.stats()["crashes"] == 1
+
+
+def kill_idle_worker(pool):
+    worker = pool._idle[0]
+    os.kill(worker.process.pid, signal.SIGKILL)
+    worker.process.join(timeout=5)
+    return worker
+
+
+def test_dead_idle_worker_is_replaced(pool):
+    worker_pid = pool.run("pid")
+    kill_idle_worker(pool)
+    assert pool.run("pid") != worker_pid
+    stats = pool.stats()
+    assert stats["crashes"] == 1
+    assert stats["live_workers"] == 1
+
+    # A worker that dies just after checkout fails the job cleanly
+    kill_idle_worker(pool).process.is_alive = lambda: True
+    with pytest.raises(ExtractionError, match="crashed"):
+        pool.run("pid")
+    assert pool.stats()["crashes"] == 2
+    assert pool.run("add", 1, 1) == 2
+
+
+def test_memory_limit(pool):
+    with pytest.raises(ExtractionError, match="memory limit"):
+        pool.run("grow")
+    assert pool.stats()["memory_kills"] == 1
+
+
+def test_workers_are_recycled_after_max_jobs():
+    pool = ExtractionPool(size=1, max_jobs=2, module_name=__name__, initializer=None)
+    try:
+        first = pool.run("pid")
+        assert pool.run("pid") == first
+        assert pool.run("pid") != first
+        stats = pool.stats()
+        assert stats["recycled"] == 1
+        assert stats["live_workers"] == 1
+        assert stats["busy_workers"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_checkout_times_out_cleanly():
+    pool = ExtractionPool(
+        size=1,
+        module_name=__name__,
+        initializer=None,
+        queue_timeouts={PRIORITY_INTERACTIVE: 0.2, PRIORITY_BACKGROUND: 0.2},
+    )
+    try:
+        busy = threading.Thread(target=pool.run, args=("nap", 2))
+        busy.start()
+        time.sleep(0.5)  # Let the first job take the only worker
+        with pytest.raises(ExtractionError, match="No extraction worker"):
+            pool.run("add", 1, 1)
+        busy.join()
+        assert pool.stats()["queue_timeouts"] == 1
+        assert pool.stats()["busy_workers"] == 0
+        assert pool.run("add", 1, 1) == 2
+    finally:
+        pool.shutdown()
+
+
+def test_background_jobs_leave_a_worker_for_interactive_jobs():
+    pool = ExtractionPool(size=2, module_name=__name__, initializer=None)
+    try:
+        pool.start()
+        background = [
+            threading.Thread(
+                target=pool.run,
+                args=("nap", 1.5),
+                kwargs={"priority": PRIORITY_BACKGROUND},
+            )
+            for _ in range(2)
+        ]
+        for thread in background:
+            thread.start()
+        time.sleep(0.3)
+        assert pool.stats()["busy_workers"] == 1  # The second one is held back
+
+        start = time.monotonic()
+        pool.run("add", 1, 1)
+        assert time.monotonic() - start < 1
+        for thread in background:
+            thread.join()
+    finally:
+        pool.shutdown()
+
+
+MAIN_SCRIPT = """
+import sys
+
+sys.path.insert(0, {root!r})
+with open({log!r}, "a") as log:
+    log.write(__name__ + "\\n")
+
+from utils.worker_pool import ExtractionPool, detach_main_module
+
+if __name__ == "__main__":
+    detach_main_module()
+    pool = ExtractionPool(size=1, module_name="os", initializer=None)
+    print(pool.run("getpid"))
+    pool.shutdown()
+"""
+
+
+def test_workers_do_not_reimport_a_detached_main_script(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    log = tmp_path / "imports.log"
+    script = tmp_path / "main_script.py"
+    script.write_text(MAIN_SCRIPT.format(root=root, log=str(log)))
+
+    result = subprocess.run(
+        [sys.executable, str(script)], capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert int(result.stdout) != os.getpid()  # The job ran in a worker
+    assert log.read_text().split() == ["__main__"]
@@ -1,36 +1,35 @@
 import json
 import requests
-import os
 from dotenv import load_dotenv
 import logging
+from .limit_utils import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    AdmissionController,
+    UpstreamOverloaded,
+    estimate_tokens,
+)
+from .provider_utils import EndpointPool, ProviderError, default_endpoints
 
 logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
-# Access the DeepSeek API key and base URL from environment variables
-deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
-deepseek_api_base = (
-    "https://openrouter.ai/api/v1/chat/completions"  # use this for OpenRouter API
-)
-deepseek_api_base = (
-    "https://api.deepseek.com/chat/completions"  # use this for actual DeepSeek API
-)
+# Aggregate in-flight and tokens-per-minute limits shared across workers
+admission = AdmissionController()
+
+# DeepSeek and OpenRouter endpoints, primary first (see UPSTREAM_ENDPOINTS).
+# Requests fail over between them and are hedged when the primary is slow;
+# every attempt takes its own admission slot.
+provider_pool = EndpointPool(default_endpoints(), admission=admission)
 
 # Configure token limits
 MAX_OUTPUT_TOKENS = 2000  # Optimized for Render free tier
 MAX_CONTEXT_TOKENS = 12000  # Slightly under max for efficiency and to avoid errors
 
 
-def query_deepseek(prompt):
-    """
-    Sends a prompt to DeepSeek AI and returns the response.
-    """
-    headers = {
-        "Authorization": f"Bearer {deepseek_api_key}",
-        "Content-Type": "application/json",
-    }
-    data = {
+def _chat_request(prompt, max_tokens=MAX_OUTPUT_TOKENS):
+    return {
         "model": "deepseek-chat",
         "messages": [
             {
@@ -39,18 +38,28 @@ def query_deepseek(prompt):
             },
             {"role": "user", "content": prompt},
         ],
-        "max_tokens": MAX_OUTPUT_TOKENS,
+        "max_tokens": max_tokens,
         "temperature": 0.7,
         "top_p": 0.9,
         "context_length": MAX_CONTEXT_TOKENS,
     }
 
+
+def query_deepseek(prompt, priority=PRIORITY_INTERACTIVE):
+    """
+    Sends a prompt to DeepSeek AI and returns the response.
+
+    Raises UpstreamOverloaded if the call is shed by admission control.
+    """
+    data = _chat_request(prompt)
+
     try:
         print(f"Sending prompt to DeepSeek: {prompt[:100]}...")
-        response = requests.post(deepseek_api_base, json=data, headers=headers)
-        response.raise_for_status()
-
-        result = response.json()
+        result = provider_pool.post(
+            data,
+            priority=priority,
+            tokens=estimate_tokens(prompt, MAX_OUTPUT_TOKENS),
+        )
 
         if (
             "choices" in result
@@ -74,7 +83,9 @@ def query_deepseek(prompt):
                     "answer": "I apologize, but I couldn't generate a proper response. Can you send that message again?"
                 }
             )
-    except requests.RequestException as e:
+    except UpstreamOverloaded:
+        raise
+    except (ProviderError, requests.RequestException) as e:
         logging.error(f"DeepSeek API request failed: {e}")
         return json.dumps(
             {"answer": f"I'm having technical difficulties right now: {str(e)}"}
@@ -84,27 +95,44 @@ def query_deepseek(prompt):
         return json.dumps({"answer": f"An unexpected error occurred: {str(e)}"})
 
 
-def query_deepseek_r1(prompt):
+def complete_deepseek(
+    prompt, priority=PRIORITY_INTERACTIVE, max_tokens=MAX_OUTPUT_TOKENS
+):
+    """
+    Send a prompt to DeepSeek AI and return the raw answer text.
+
+    Unlike query_deepseek, failures are raised (ProviderError, or
+    UpstreamOverloaded when shed) so callers can report them per question.
+    """
+    result = provider_pool.post(
+        _chat_request(prompt, max_tokens),
+        priority=priority,
+        tokens=estimate_tokens(prompt, max_tokens),
+    )
+
+    try:
+        content = result["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        content = None
+    if not content or not content.strip():
+        raise ProviderError("DeepSeek API returned an empty or invalid response")
+    return content
+
+
+def query_deepseek_r1(prompt, priority=PRIORITY_BACKGROUND):
     """Send the prompt to DeepSeek R1 API and get the response."""
     try:
-        response = requests.post(
-            deepseek_api_base,
-            headers={
-                "Authorization": f"Bearer {deepseek_api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
+        response_data = provider_pool.post(
+            {
                 "model": "deepseek-reasoner",
                 "messages": [{"role": "user", "content": prompt}],
                 "max_tokens": MAX_OUTPUT_TOKENS,
                 "temperature": 0.7,
                 "top_p": 0.9,
             },
+            priority=priority,
+            tokens=estimate_tokens(prompt, MAX_OUTPUT_TOKENS),
         )
-        response_data = response.json()
-
-        if response.status_code != 200:
-            raise Exception(f"Error querying DeepSeek R1: {response_data}")
 
         if (
             "choices" in response_data
@@ -116,6 +144,8 @@ def query_deepseek_r1(prompt):
             return json.dumps({"answer": content})
 
         raise Exception(f"Unexpected response structure: {response_data}")
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         logging.error(f"Error querying DeepSeek R1: {e}")
         return json.dumps({"answer": f"Error occurred: {str(e)}"})
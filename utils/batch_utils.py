@@ -0,0 +1,73 @@
+import os
+import re
+from dotenv import load_dotenv
+from .limit_utils import estimate_tokens
+
+# Load environment variables from .env file
+load_dotenv()
+
+# /chat/batch answers many questions about one document. The document context
+# is prepared once and questions are grouped into multi-question prompts, each
+# kept within BATCH_PROMPT_TOKENS including BATCH_ANSWER_TOKENS of output per
+# question. Groups are sent to the upstream API concurrently.
+MAX_BATCH_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 50))
+BATCH_PROMPT_TOKENS = int(os.getenv("BATCH_PROMPT_TOKENS", 12000))
+BATCH_ANSWER_TOKENS = int(os.getenv("BATCH_ANSWER_TOKENS", 300))
+BATCH_MAX_GROUP = int(os.getenv("BATCH_MAX_GROUP", 8))  # 1 = one request each
+
+# Answers to a multi-question prompt start with the question's marker, e.g.
+# "[Q3] The total is ..."; models sometimes bold it or add a colon.
+_ANSWER_MARKER = re.compile(r"^[ \t]*\**\[Q(\d+)\]\**[:.]?[ \t]*", re.MULTILINE)
+
+
+def group_questions(
+    questions,
+    context_tokens,
+    prompt_tokens=BATCH_PROMPT_TOKENS,
+    answer_tokens=BATCH_ANSWER_TOKENS,
+    max_group=BATCH_MAX_GROUP,
+):
+    """
+    Split question indices into groups that each fit in one prompt.
+
+    context_tokens is the shared document context repeated in every prompt;
+    each question adds its own length plus answer_tokens of output. A
+    question that does not fit even on its own still gets a group.
+    """
+    groups = []
+    current = []
+    used = context_tokens
+    for i, question in enumerate(questions):
+        cost = estimate_tokens(question, answer_tokens)
+        if current and (len(current) >= max_group or used + cost > prompt_tokens):
+            groups.append(current)
+            current = []
+            used = context_tokens
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def format_questions(questions):
+    """Number questions as [Q1], [Q2], ... for a multi-question prompt."""
+    return "\n".join(f"[Q{n}] {question}" for n, question in enumerate(questions, 1))
+
+
+def split_answers(text, count):
+    """
+    Split a multi-question response on its [Qn] markers.
+
+    Returns {n: answer} for the question numbers 1..count that were
+    answered; missing or empty answers are left out.
+    """
+    answers = {}
+    markers = list(_ANSWER_MARKER.finditer(text or ""))
+    for marker, following in zip(markers, markers[1:] + [None]):
+        number = int(marker.group(1))
+        end = following.start() if following else len(text)
+        answer = text[marker.end() : end].strip()
+        if 1 <= number <= count and answer and number not in answers:
+            answers[number] = answer
+    return answers
@@ -1,13 +1,11 @@
 import os
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
 from dotenv import load_dotenv
 import io
 import json
 
+# The Google API client libraries are slow to import, so they are imported
+# inside the functions that need them to keep cold starts fast.
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -37,6 +35,10 @@ def authenticate_google_drive():
 
 def authenticate_with_oauth(env, scopes):
     """Handle OAuth authentication for both development and production."""
+    from googleapiclient.discovery import build
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+
     creds = None
     token_file = "token.json"
 
@@ -76,6 +78,9 @@ def authenticate_with_oauth(env, scopes):
 
 def authenticate_with_service_account(env, scopes):
     """Handle service account authentication for both development and production."""
+    from googleapiclient.discovery import build
+    from google.oauth2 import service_account
+
     if env == "production":
         # In production, use service account from environment variable
         credentials_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -108,14 +113,16 @@ def authenticate_with_service_account(env, scopes):
 
     return build('drive', 'v3', credentials=creds)
 
-def upload_file_to_drive(service, file_path, file_name):
+def upload_file_to_drive(service, file_path, file_name, mimetype='application/pdf'):
     """Upload a file to Google Drive in the specified folder."""
+    from googleapiclient.http import MediaFileUpload
+
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
     try:
         file_metadata = {'name': file_name, 'parents': [FOLDER_ID]}
-        media = MediaFileUpload(file_path, mimetype='application/pdf')
+        media = MediaFileUpload(file_path, mimetype=mimetype, resumable=True)
         
         file = service.files().create(
             body=file_metadata, 
@@ -128,8 +135,35 @@ def upload_file_to_drive(service, file_path, file_name):
     except Exception as e:
         raise Exception(f"Upload failed: {str(e)}")
 
+def update_file_in_drive(service, file_id, file_path, mimetype='application/octet-stream'):
+    """Replace the contents of an existing Google Drive file."""
+    from googleapiclient.http import MediaFileUpload
+
+    try:
+        media = MediaFileUpload(file_path, mimetype=mimetype, resumable=True)
+        service.files().update(fileId=file_id, media_body=media).execute()
+        return file_id
+    except Exception as e:
+        raise Exception(f"Update failed: {str(e)}")
+
+def find_file_in_drive(service, file_name):
+    """Return the ID of the named file in the upload folder, or None."""
+    try:
+        escaped_name = file_name.replace("\\", "\\\\").replace("'", "\\'")
+        result = service.files().list(
+            q=f"name = '{escaped_name}' and '{FOLDER_ID}' in parents and trashed = false",
+            fields='files(id)',
+            pageSize=1
+        ).execute()
+        files = result.get('files', [])
+        return files[0]['id'] if files else None
+    except Exception as e:
+        raise Exception(f"Search failed: {str(e)}")
+
 def download_file_from_drive(service, file_id, destination_path):
     """Download a file from Google Drive."""
+    from googleapiclient.http import MediaIoBaseDownload
+
     try:
         request = service.files().get_media(fileId=file_id)
         fh = io.FileIO(destination_path, 'wb')
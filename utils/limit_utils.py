@@ -0,0 +1,279 @@
+import os
+import math
+import sqlite3
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+# Load environment variables from .env file
+load_dotenv()
+
+# Priorities: lower values are admitted first
+PRIORITY_INTERACTIVE = 0  # User-facing chat
+PRIORITY_BACKGROUND = 1  # Summarization and other background work
+
+# Aggregate limits for upstream API calls, shared by all gunicorn workers
+MAX_IN_FLIGHT = int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", 4))
+TOKENS_PER_MINUTE = int(os.getenv("UPSTREAM_TOKENS_PER_MINUTE", 60000))  # 0 = off
+MAX_QUEUE_SIZE = int(os.getenv("UPSTREAM_QUEUE_SIZE", 16))
+QUEUE_TIMEOUTS = {
+    PRIORITY_INTERACTIVE: float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", 15)),
+    PRIORITY_BACKGROUND: float(os.getenv("UPSTREAM_BACKGROUND_QUEUE_TIMEOUT", 60)),
+}
+# Admitted calls older than this are assumed to belong to a dead worker
+SLOT_LEASE_SECONDS = float(os.getenv("UPSTREAM_SLOT_LEASE", 300))
+POLL_INTERVAL = 0.05
+
+# SQLite file used as a local stand-in for a shared store such as Redis
+LIMIT_STORE_PATH = os.getenv("UPSTREAM_LIMIT_STORE", "upstream_limits.db")
+
+
+class UpstreamOverloaded(Exception):
+    """Raised when a call is shed; maps to 503 with a Retry-After header."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class AdmissionController:
+    """
+    Admission control for upstream API calls.
+
+    Callers take a ticket in a bounded priority queue and are admitted once
+    they are at the head of the queue, fewer than max_in_flight calls are
+    running and the tokens-per-minute budget allows it. Calls that cannot be
+    queued, or wait past their deadline, are shed with UpstreamOverloaded.
+    State lives in SQLite so every worker process sees the same limits.
+    """
+
+    def __init__(
+        self,
+        path=LIMIT_STORE_PATH,
+        max_in_flight=MAX_IN_FLIGHT,
+        tokens_per_minute=TOKENS_PER_MINUTE,
+        max_queue_size=MAX_QUEUE_SIZE,
+        queue_timeouts=None,
+    ):
+        self.path = path
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue_size = max_queue_size
+        self.queue_timeouts = queue_timeouts or QUEUE_TIMEOUTS
+        self.shed_count = 0
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tickets (
+                    id TEXT PRIMARY KEY,
+                    priority INTEGER NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    deadline REAL NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    admitted_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS token_usage (
+                    ts REAL NOT NULL,
+                    tokens INTEGER NOT NULL
+                );
+                """)
+        finally:
+            conn.close()
+
+    def _purge(self, conn, now):
+        """Drop expired queue tickets, stale leases and old token usage."""
+        conn.execute(
+            "DELETE FROM tickets WHERE admitted_at IS NULL AND deadline < ?", (now,)
+        )
+        conn.execute(
+            "DELETE FROM tickets WHERE admitted_at IS NOT NULL AND admitted_at < ?",
+            (now - SLOT_LEASE_SECONDS,),
+        )
+        conn.execute("DELETE FROM token_usage WHERE ts < ?", (now - 60,))
+
+    def _retry_after(self, conn, now, tokens):
+        """Seconds until enough of the per-minute token budget frees up."""
+        if not self.tokens_per_minute:
+            return 1
+        rows = conn.execute("SELECT ts, tokens FROM token_usage ORDER BY ts").fetchall()
+        used = sum(row[1] for row in rows)
+        if used + tokens <= self.tokens_per_minute:
+            return 1
+        for ts, row_tokens in rows:
+            used -= row_tokens
+            if used + tokens <= self.tokens_per_minute:
+                return ts + 60 - now
+        return 60
+
+    def _try_admit(self, conn, ticket_id, tokens, now):
+        """Admit the ticket if it is next in line and capacity is free."""
+        head = conn.execute(
+            "SELECT id FROM tickets WHERE admitted_at IS NULL "
+            "ORDER BY priority, enqueued_at LIMIT 1"
+        ).fetchone()
+        if not head or head[0] != ticket_id:
+            return False
+
+        in_flight = conn.execute(
+            "SELECT COUNT(*) FROM tickets WHERE admitted_at IS NOT NULL"
+        ).fetchone()[0]
+        if in_flight >= self.max_in_flight:
+            return False
+
+        if self.tokens_per_minute:
+            used = conn.execute(
+                "SELECT COALESCE(SUM(tokens), 0) FROM token_usage"
+            ).fetchone()[0]
+            # A single oversized call is still allowed into an idle minute
+            if used and used + tokens > self.tokens_per_minute:
+                return False
+
+        conn.execute(
+            "UPDATE tickets SET admitted_at = ? WHERE id = ?", (now, ticket_id)
+        )
+        conn.execute(
+            "INSERT INTO token_usage (ts, tokens) VALUES (?, ?)", (now, tokens)
+        )
+        return True
+
+    def _shed(self, message, retry_after):
+        self.shed_count += 1
+        logger.warning(f"Shedding upstream call: {message}")
+        raise UpstreamOverloaded(message, retry_after)
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, tokens=0):
+        """Block until admitted and return the ticket id, or raise UpstreamOverloaded."""
+        conn = self._connect()
+        ticket_id = uuid.uuid4().hex
+        timeout = self.queue_timeouts.get(
+            priority, self.queue_timeouts[PRIORITY_INTERACTIVE]
+        )
+        try:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            self._purge(conn, now)
+            queued = conn.execute(
+                "SELECT COUNT(*) FROM tickets WHERE admitted_at IS NULL"
+            ).fetchone()[0]
+            if queued >= self.max_queue_size:
+                retry_after = self._retry_after(conn, now, tokens)
+                conn.execute("COMMIT")
+                self._shed("queue is full", retry_after)
+            conn.execute(
+                "INSERT INTO tickets (id, priority, enqueued_at, deadline, tokens) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (ticket_id, priority, now, now + timeout, tokens),
+            )
+            admitted = self._try_admit(conn, ticket_id, tokens, now)
+            conn.execute("COMMIT")
+
+            while not admitted:
+                time.sleep(POLL_INTERVAL)
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                self._purge(conn, now)
+                exists = conn.execute(
+                    "SELECT 1 FROM tickets WHERE id = ?", (ticket_id,)
+                ).fetchone()
+                if not exists:
+                    retry_after = self._retry_after(conn, now, tokens)
+                    conn.execute("COMMIT")
+                    self._shed(f"queued longer than {timeout}s", retry_after)
+                admitted = self._try_admit(conn, ticket_id, tokens, now)
+                conn.execute("COMMIT")
+
+            return ticket_id
+        except UpstreamOverloaded:
+            raise
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+            raise
+        finally:
+            conn.close()
+
+    def try_acquire(self, priority=PRIORITY_INTERACTIVE, tokens=0):
+        """
+        Admit a call only if it can run right now without jumping the queue.
+
+        Returns the ticket id, or None instead of waiting (e.g. for a hedge,
+        which is not worth queueing for).
+        """
+        conn = self._connect()
+        ticket_id = uuid.uuid4().hex
+        try:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            self._purge(conn, now)
+            conn.execute(
+                "INSERT INTO tickets (id, priority, enqueued_at, deadline, tokens) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (ticket_id, priority, now, now, tokens),
+            )
+            if not self._try_admit(conn, ticket_id, tokens, now):
+                conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+                ticket_id = None
+            conn.execute("COMMIT")
+            return ticket_id
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release(self, ticket_id):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+        finally:
+            conn.close()
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE, tokens=0):
+        """Context manager holding an upstream slot for the duration of a call."""
+        ticket_id = self.acquire(priority, tokens)
+        try:
+            yield
+        finally:
+            self.release(ticket_id)
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            in_flight, queued = conn.execute(
+                "SELECT COUNT(admitted_at), COUNT(*) - COUNT(admitted_at) FROM tickets"
+            ).fetchone()
+            tokens = conn.execute(
+                "SELECT COALESCE(SUM(tokens), 0) FROM token_usage WHERE ts >= ?",
+                (time.time() - 60,),
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "in_flight": in_flight,
+            "queued": queued,
+            "tokens_last_minute": tokens,
+            "shed": self.shed_count,
+            "max_in_flight": self.max_in_flight,
+            "tokens_per_minute": self.tokens_per_minute,
+            "max_queue_size": self.max_queue_size,
+        }
+
+
+def estimate_tokens(prompt, max_output_tokens=0):
+    """Rough token estimate (about 4 characters per token) plus the output budget."""
+    return len(prompt) // 4 + max_output_tokens
@@ -0,0 +1,130 @@
+import os
+import mmap
+import struct
+
+# Per-page text storage for a session, as two append-only files:
+#   <session_id>.pages      contiguous UTF-8 blob of every page's text
+#   <session_id>.pages.idx  offset table, one fixed-size record per page
+# The blob is written before the index record, so a reader only ever sees
+# pages whose bytes are complete. Readers memory-map both files read-only,
+# which lets several worker processes share them through the page cache
+# without copying the whole document into each process.
+INDEX_RECORD = struct.Struct("<IQI")  # page number, blob offset, byte length
+
+
+def _paths(content_dir, session_id):
+    base = os.path.join(content_dir, f"{session_id}.pages")
+    return base, f"{base}.idx"
+
+
+def has_pages(content_dir, session_id):
+    return os.path.exists(_paths(content_dir, session_id)[1])
+
+
+def append_pages(content_dir, session_id, pages):
+    """Append (page_number, text) pairs; pages without text are skipped."""
+    blob_path, index_path = _paths(content_dir, session_id)
+    records = []
+    with open(blob_path, "ab") as blob:
+        offset = blob.tell()
+        for page_number, text in pages:
+            if not text:
+                continue
+            data = text.encode("utf-8")
+            blob.write(data)
+            records.append(INDEX_RECORD.pack(page_number, offset, len(data)))
+            offset += len(data)
+
+    with open(index_path, "ab") as index:
+        index.write(b"".join(records))
+    return len(records)
+
+
+def _map(path):
+    """Memory-map a file read-only; empty or missing files map to b''."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PageReader:
+    """
+    Lazy, read-only view over a session's stored pages.
+
+    Only the pages that are actually requested are decoded, e.g.:
+
+        with PageReader(CONTENT_DIR, session_id) as pages:
+            preview, first, last = pages.text(max_chars=2000)
+    """
+
+    def __init__(self, content_dir, session_id):
+        blob_path, index_path = _paths(content_dir, session_id)
+        self._index = _map(index_path)
+        self._blob = _map(blob_path)
+        self._count = len(self._index) // INDEX_RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for mapped in (self._index, self._blob):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, i):
+        return INDEX_RECORD.unpack_from(self._index, i * INDEX_RECORD.size)
+
+    def _decode(self, offset, length):
+        return self._blob[offset : offset + length].decode("utf-8")
+
+    def page_numbers(self):
+        return [self._record(i)[0] for i in range(self._count)]
+
+    def page(self, page_number):
+        """Return the text of one page, or None if it has no stored text."""
+        for i in range(self._count):
+            number, offset, length = self._record(i)
+            if number == page_number:
+                return self._decode(offset, length)
+        return None
+
+    def iter_pages(self, first_page=1, last_page=None):
+        """Yield (page_number, text) for stored pages within the range."""
+        for i in range(self._count):
+            number, offset, length = self._record(i)
+            if number < first_page or (last_page and number > last_page):
+                continue
+            yield number, self._decode(offset, length)
+
+    def text(self, max_chars=None, markers=True):
+        """
+        Join pages in order until max_chars is reached.
+
+        Returns (text, first_page, last_page) for the pages included. With
+        markers, each page starts with "[Page N]" so answers can cite it.
+        """
+        parts = []
+        used = 0
+        first_page = last_page = None
+        for number, page_text in self.iter_pages():
+            if markers:
+                page_text = f"[Page {number}]\n{page_text}"
+            separator = 1 if parts else 0  # The "\n" joining it to the previous page
+            if max_chars is not None:
+                if used + separator >= max_chars:
+                    break
+                page_text = page_text[: max_chars - used - separator]
+            parts.append(page_text)
+            used += separator + len(page_text)
+            first_page = first_page or number
+            last_page = number
+            if max_chars is not None and used >= max_chars:
+                break
+        return "\n".join(parts), first_page, last_page
@@ -1,69 +1,108 @@
 import json
 import os
-import fitz  # PyMuPDF for PDF text extraction
-import camelot  # For table extraction from PDF
 from .api_utils import (
     process_deepseek_response,
     query_deepseek_r1,
 )  # Import our R1 summarizer
-import pandas as pd
 
+# PyMuPDF (fitz), camelot and pandas are slow to import, so they are imported
+# on first use to keep cold starts fast. See preload_extractors().
+
+
+def preload_extractors():
+    """Import the PDF extraction libraries ahead of the first upload."""
+    import fitz  # noqa: F401
+    import camelot  # noqa: F401
+    import pandas  # noqa: F401
+
+
+# Table extraction is capped to stay within Render's free tier limits
+MAX_TABLE_PAGES = int(os.getenv("MAX_TABLE_PAGES", 20))
+
+
+def get_page_count(pdf_path):
+    """Return the number of pages in the PDF, or 0 if it cannot be opened."""
+    import fitz
+
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception as e:
+        print(f"Error reading PDF page count: {e}")
+        return 0
+
+
+# A function to extract text page by page from PDF using PyMuPDF
+def extract_pdf_pages(pdf_path, first_page=1, last_page=None):
+    """
+    Memory-efficient PDF text extraction with better error handling.
+
+    Returns a list of (page_number, text) for pages with text. Pages are
+    1-based and inclusive; by default the whole document is read.
+    """
+    import fitz  # PyMuPDF for PDF text extraction
 
-# A function to extract text from PDF using PyMuPDF
-def extract_pdf_text(pdf_path):
-    """Memory-efficient PDF text extraction with better error handling"""
     try:
         if not os.path.exists(pdf_path):
             print(f"PDF file not found: {pdf_path}")
-            return None
+            return []
 
         doc = fitz.open(pdf_path)
-        text_chunks = []
+        pages = []
+        last_page = min(last_page or doc.page_count, doc.page_count)
 
-        for page in doc:
+        for page in doc.pages(first_page - 1, last_page):
             try:
                 chunk = page.get_text()
-                if chunk:  # Only append non-empty chunks
-                    text_chunks.append(chunk)
+                if chunk:  # Only keep non-empty pages
+                    pages.append((page.number + 1, chunk))
                 page.clean_contents()  # Clean up page resources
             except Exception as page_error:
                 print(f"Error extracting text from page: {page_error}")
                 continue
 
         doc.close()  # Explicitly close the document
-
-        if not text_chunks:
-            return None
-
-        return "\n".join(text_chunks)
+        return pages
 
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
+        return []
+
+
+# A function to extract text from PDF as a single string
+def extract_pdf_text(pdf_path, first_page=1, last_page=None):
+    """Extract the text of a page range joined into one string, or None."""
+    pages = extract_pdf_pages(pdf_path, first_page, last_page)
+    if not pages:
         return None
+    return "\n".join(text for _, text in pages)
 
 
 # A function to extract tables from PDF using Camelot
-def extract_pdf_tables(pdf_path):
-    """Extract tables from more pages while staying within Render's free tier limits."""
+def extract_pdf_tables(pdf_path, first_page=1, last_page=None):
+    """
+    Extract tables from more pages while staying within Render's free tier limits.
+
+    Pages are 1-based and inclusive; pages beyond MAX_TABLE_PAGES are skipped.
+    """
+    import camelot  # For table extraction from PDF
+
     tables = []
     try:
-        max_pages = 20  # Adjusted limit for Render's free tier
-
         # First check if the PDF exists and is readable
         if not os.path.exists(pdf_path):
             print(f"PDF file not found: {pdf_path}")
             return tables
 
         # Get actual page count
-        doc = fitz.open(pdf_path)
-        actual_pages = min(doc.page_count, max_pages)
-        doc.close()
+        actual_pages = min(get_page_count(pdf_path), MAX_TABLE_PAGES)
+        last_page = min(last_page or actual_pages, actual_pages)
 
-        if actual_pages == 0:
+        if last_page < first_page:
             return tables
 
         # Use string format for pages only if we have pages to process
-        pages_str = f"1-{actual_pages}"
+        pages_str = f"{first_page}-{last_page}"
         extracted_tables = camelot.read_pdf(pdf_path, pages=pages_str, flavor="stream")
 
         if extracted_tables and extracted_tables.n > 0:
@@ -114,6 +153,12 @@ def extract_pdf_tables(pdf_path):
 #         return text[:2000]
 
 
+# How much document text summarize_text() can use: the preview length without
+# summarization, and roughly the 6 chunks of 2000 words it summarizes at most
+PREVIEW_CHARS = 2000
+SUMMARY_SOURCE_CHARS = 6 * 2000 * 10
+
+
 def summarize_text(text, enable_summarization=False):
     """Enable summarization for longer chunks when toggled."""
     if not enable_summarization:
@@ -150,6 +195,8 @@ def summarize_text(text, enable_summarization=False):
 # A function to split large tables into smaller parts
 def split_large_tables(tables, max_rows=50):
     """Split tables into smaller parts if they exceed the max_rows limit."""
+    import pandas as pd
+
     table_chunks = []
     for table_json in tables:
         try:
@@ -0,0 +1,346 @@
+import os
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from dotenv import load_dotenv
+
+from .limit_utils import PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+# Load environment variables from .env file
+load_dotenv()
+
+# Upstream request timeout (seconds) for a single chat completion
+REQUEST_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 120))
+
+# Hedging configuration: wait for the primary's p95 latency (clamped to these
+# bounds) before firing the same request at the secondary endpoint
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 2))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", 30))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", 10))
+HEDGE_MIN_SAMPLES = 20  # Latency samples needed before trusting the p95
+
+# Health tracking: an endpoint that fails this many times in a row is skipped
+# as primary for the cooldown period
+MAX_CONSECUTIVE_FAILURES = 3
+FAILURE_COOLDOWN = float(os.getenv("ENDPOINT_FAILURE_COOLDOWN", 30))
+
+
+class ProviderError(Exception):
+    """Raised when no endpoint produced a usable response."""
+
+
+class _Cancelled(Exception):
+    """Raised inside an attempt that lost the race to another endpoint."""
+
+
+class Endpoint:
+    """
+    A single OpenAI-compatible chat completions endpoint with health stats.
+
+    Latencies are kept per logical model, since a reasoning model is far
+    slower than a chat model on the same endpoint.
+    """
+
+    def __init__(self, name, url, api_key, models=None, window=200):
+        self.name = name
+        self.url = url
+        self.api_key = api_key
+        self.models = models or {}
+        self.window = window
+        self._latencies = {}  # logical model -> recent latencies
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.wins = 0
+
+    def model_for(self, model):
+        """Map the logical model name to this endpoint's model identifier."""
+        return self.models.get(model, model)
+
+    def _add_latency(self, model, latency):
+        samples = self._latencies.get(model)
+        if samples is None:
+            samples = self._latencies[model] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def record_latency(self, latency, model=None):
+        """Add a latency sample without changing the health state."""
+        with self._lock:
+            self._add_latency(model, latency)
+
+    def record_success(self, latency, model=None):
+        with self._lock:
+            self._add_latency(model, latency)
+            self.consecutive_failures = 0
+            self.unhealthy_until = 0.0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                self.unhealthy_until = time.monotonic() + FAILURE_COOLDOWN
+
+    def is_healthy(self):
+        return time.monotonic() >= self.unhealthy_until
+
+    def p95(self, model=None):
+        """Return the model's p95 latency in seconds, or None with too few samples."""
+        with self._lock:
+            samples = self._latencies.get(model, ())
+            if len(samples) < HEDGE_MIN_SAMPLES:
+                return None
+            samples = sorted(samples)
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def stats(self):
+        with self._lock:
+            models = list(self._latencies)
+        p95 = {}
+        for model in models:
+            seconds = self.p95(model)
+            p95[model] = round(seconds, 3) if seconds is not None else None
+        return {
+            "name": self.name,
+            "url": self.url,
+            "healthy": self.is_healthy(),
+            "requests": self.requests,
+            "failures": self.failures,
+            "wins": self.wins,
+            "consecutive_failures": self.consecutive_failures,
+            "p95_seconds": p95,
+        }
+
+
+class EndpointPool:
+    """
+    Sends chat completion requests to several endpoints with failover and
+    hedging.
+
+    The first healthy endpoint is the primary. If it has not answered within
+    its adaptive p95 latency, the same request is fired at the next endpoint
+    and whichever finishes first wins. If an endpoint errors, the next one is
+    tried immediately.
+
+    With an admission controller, every attempt holds its own slot and is
+    charged its tokens, so hedges and failovers count against the upstream
+    limits. A hedge is only sent if a slot is free right away.
+
+    Cancelling the loser only skips reading its body: completions are not
+    streamed, so its thread (and the upstream generation) keeps running until
+    the response headers arrive, i.e. for the whole request. Losers keep
+    their executor thread until then, and its latency is still recorded so
+    the p95 is not biased towards the fast responses that won.
+    """
+
+    def __init__(self, endpoints, hedge=HEDGE_ENABLED, max_workers=16, admission=None):
+        self.endpoints = list(endpoints)
+        self.hedge = hedge
+        self.admission = admission
+        self.hedged_requests = 0
+        self.skipped_hedges = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="upstream"
+        )
+
+    def ordered_endpoints(self):
+        """Healthy endpoints first, keeping the configured preference order."""
+        healthy = [ep for ep in self.endpoints if ep.is_healthy()]
+        unhealthy = [ep for ep in self.endpoints if not ep.is_healthy()]
+        return healthy + unhealthy
+
+    def hedge_delay(self, endpoint, model=None):
+        p95 = endpoint.p95(model)
+        if p95 is None:
+            return HEDGE_DEFAULT_DELAY
+        return min(max(p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def _attempt(self, endpoint, payload, timeout, cancelled, ticket=None):
+        """
+        Run one request against one endpoint and return the parsed JSON.
+
+        The admission ticket, if any, is released once the request has really
+        finished, even if it lost the race long before.
+        """
+        try:
+            return self._request(endpoint, payload, timeout, cancelled)
+        finally:
+            if ticket:
+                self.admission.release(ticket)
+
+    def _request(self, endpoint, payload, timeout, cancelled):
+        model = payload.get("model")
+        body = dict(payload, model=endpoint.model_for(model))
+        headers = {
+            "Authorization": f"Bearer {endpoint.api_key}",
+            "Content-Type": "application/json",
+        }
+        endpoint.requests += 1
+        start = time.monotonic()
+        try:
+            # Stream so a cancelled loser can drop the connection before
+            # reading the body
+            with requests.post(
+                endpoint.url, json=body, headers=headers, timeout=timeout, stream=True
+            ) as response:
+                if cancelled.is_set():
+                    # Lost the race; how slow it was still counts for the p95
+                    endpoint.record_latency(time.monotonic() - start, model)
+                    raise _Cancelled()
+                response.raise_for_status()
+                result = response.json()
+        except _Cancelled:
+            raise
+        except Exception:
+            if cancelled.is_set():
+                # Censored at the time it gave up: at least this slow
+                endpoint.record_latency(time.monotonic() - start, model)
+            else:
+                endpoint.record_failure()
+            raise
+
+        endpoint.record_success(time.monotonic() - start, model)
+        if cancelled.is_set():
+            raise _Cancelled()
+        return result
+
+    def post(
+        self, payload, timeout=REQUEST_TIMEOUT, priority=PRIORITY_INTERACTIVE, tokens=0
+    ):
+        """
+        Send a chat completion payload and return the first successful JSON
+        response.
+
+        Raises ProviderError carrying the last upstream error if every
+        endpoint failed or the overall timeout elapsed, and UpstreamOverloaded
+        if admission control sheds the call.
+        """
+        candidates = self.ordered_endpoints()
+        if not candidates:
+            raise ProviderError("No API endpoints configured")
+
+        cancelled = threading.Event()
+        pending = {}
+        errors = []
+        next_index = 0
+        start = time.monotonic()
+        deadline = start + timeout
+        hedge_at = None
+
+        def launch(ticket=None):
+            nonlocal next_index, hedge_at
+            endpoint = candidates[next_index]
+            next_index += 1
+            try:
+                future = self._executor.submit(
+                    self._attempt, endpoint, payload, timeout, cancelled, ticket
+                )
+            except Exception:
+                if ticket:
+                    self.admission.release(ticket)
+                raise
+            pending[future] = endpoint
+            if self.hedge and next_index < len(candidates):
+                hedge_at = time.monotonic() + self.hedge_delay(
+                    endpoint, payload.get("model")
+                )
+            else:
+                hedge_at = None
+
+        def acquire():
+            if self.admission:
+                return self.admission.acquire(priority, tokens)
+            return None
+
+        launch(acquire())
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                wait_until = deadline if hedge_at is None else min(hedge_at, deadline)
+                done, _ = wait(
+                    pending, timeout=wait_until - now, return_when=FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Primary is slower than its p95: hedge to the next endpoint
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        ticket = None
+                        if self.admission:
+                            ticket = self.admission.try_acquire(priority, tokens)
+                            if not ticket:
+                                # Upstream is saturated; a hedge would only add load
+                                self.skipped_hedges += 1
+                                hedge_at = None
+                                continue
+                        self.hedged_requests += 1
+                        logger.info(f"Hedging request to {candidates[next_index].name}")
+                        launch(ticket)
+                    continue
+
+                for future in done:
+                    endpoint = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"Endpoint {endpoint.name} failed: {e}")
+                        errors.append(e)
+                        continue
+                    endpoint.wins += 1
+                    return result
+
+                # Fail over immediately if nothing is left in flight
+                if not pending and next_index < len(candidates):
+                    launch(acquire())
+        finally:
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+        if errors:
+            raise ProviderError(f"All endpoints failed: {errors[-1]}") from errors[-1]
+        raise ProviderError(f"Upstream request timed out after {timeout}s")
+
+    def stats(self):
+        return {
+            "hedged_requests": self.hedged_requests,
+            "skipped_hedges": self.skipped_hedges,
+            "endpoints": [ep.stats() for ep in self.endpoints],
+        }
+
+
+def default_endpoints():
+    """Build the endpoint list from the environment, primary first."""
+    deepseek_key = os.getenv("DEEPSEEK_API_KEY")
+    openrouter_key = os.getenv("OPENROUTER_API_KEY", deepseek_key)
+
+    available = {
+        "deepseek": Endpoint(
+            "deepseek",
+            os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/chat/completions"),
+            deepseek_key,
+        ),
+        "openrouter": Endpoint(
+            "openrouter",
+            os.getenv(
+                "OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions"
+            ),
+            openrouter_key,
+            models={
+                "deepseek-chat": "deepseek/deepseek-chat",
+                "deepseek-reasoner": "deepseek/deepseek-r1",
+            },
+        ),
+    }
+
+    order = os.getenv("UPSTREAM_ENDPOINTS", "deepseek,openrouter")
+    return [available[name.strip()] for name in order.split(",") if name.strip()]
@@ -0,0 +1,348 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import tarfile
+import tempfile
+import threading
+from dotenv import load_dotenv
+from .session_utils import content_path, load_content
+
+logger = logging.getLogger(__name__)
+# Load environment variables from .env file
+load_dotenv()
+
+# Sessions are cached on the local disk of whichever node touched them last
+# and archived in a shared store, so any node behind the load balancer can
+# serve any session:
+#   <session_id>.artifacts.tar  content JSON, page store and table store
+#   <session_id>.source.pdf     the uploaded PDF, to re-extract from if the
+#                               artifacts are missing
+# A local copy of a session that was still processing when it was fetched is
+# refreshed from the store at most every SESSION_REFRESH_SECONDS. The time of
+# the last fetch is the mtime of a <session_id>.fetched file next to the
+# content JSON, so every worker process on the node sees it.
+SESSION_REFRESH_SECONDS = float(os.getenv("SESSION_REFRESH_SECONDS", 5))
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class SessionStoreError(Exception):
+    """Raised when the shared store cannot be reached."""
+
+
+class LocalDirectoryBackend:
+    """Shared store on a directory, e.g. an NFS mount or a stand-in for tests."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, name, file_path):
+        path = os.path.join(self.root, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(file_path, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    def get(self, name, destination_path):
+        """Copy the named object to destination_path; False if it does not exist."""
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return False
+        shutil.copyfile(path, destination_path)
+        return True
+
+
+class DriveBackend:
+    """Shared store on the Google Drive upload folder."""
+
+    def __init__(self, service_getter):
+        self.service_getter = service_getter
+
+    def _service(self):
+        service = self.service_getter()
+        if service is None:
+            raise SessionStoreError("Google Drive is not configured")
+        return service
+
+    def put(self, name, file_path):
+        from .drive_utils import find_file_in_drive, update_file_in_drive
+        from .drive_utils import upload_file_to_drive
+
+        service = self._service()
+        mimetype = "application/pdf" if name.endswith(".pdf") else "application/x-tar"
+        file_id = find_file_in_drive(service, name)
+        if file_id:
+            return update_file_in_drive(service, file_id, file_path, mimetype)
+        return upload_file_to_drive(service, file_path, name, mimetype)
+
+    def get(self, name, destination_path):
+        from .drive_utils import download_file_from_drive, find_file_in_drive
+
+        service = self._service()
+        file_id = find_file_in_drive(service, name)
+        if not file_id:
+            return False
+        download_file_from_drive(service, file_id, destination_path)
+        return True
+
+
+def _valid_session_id(session_id):
+    try:
+        return str(uuid.UUID(session_id)) == session_id
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+class SessionStore:
+    """
+    Tiered session storage: local content directory in front of a shared
+    backend.
+
+    ensure_local() makes a session available in the content directory by
+    fetching its archived artifacts or, failing that, downloading the source
+    PDF and handing it to rebuild(session_id, pdf_path). With no backend only
+    the local copy is used.
+    """
+
+    def __init__(self, content_dir, backend=None, rebuild=None):
+        self.content_dir = content_dir
+        self.backend = backend
+        self.rebuild = rebuild
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+        self.counters = {
+            "local_hits": 0,
+            "artifact_fetches": 0,
+            "refreshes": 0,
+            "rebuilds": 0,
+            "misses": 0,
+            "errors": 0,
+        }
+
+    def _lock_for(self, session_id):
+        with self._registry_lock:
+            return self._locks.setdefault(session_id, threading.Lock())
+
+    def _count(self, name):
+        with self._registry_lock:
+            self.counters[name] += 1
+
+    def _artifact_paths(self, session_id):
+        """Local artifact files of a session, content JSON last."""
+        paths = []
+        for suffix in (".pages", ".pages.idx"):
+            path = os.path.join(self.content_dir, f"{session_id}{suffix}")
+            if os.path.exists(path):
+                paths.append(path)
+        table_dir = os.path.join(self.content_dir, f"{session_id}.tables")
+        if os.path.isdir(table_dir):
+            paths.extend(
+                os.path.join(table_dir, name) for name in sorted(os.listdir(table_dir))
+            )
+        paths.append(content_path(self.content_dir, session_id))
+        return paths
+
+    def archive(self, session_id):
+        """
+        Upload the session's current artifacts to the shared store.
+
+        Safe to call repeatedly while ingestion progresses, as long as it is
+        called from the thread that writes the session. Returns the backend's
+        object ID, or None if there is no backend or the upload failed.
+        """
+        if not self.backend:
+            return None
+        fd, tar_path = tempfile.mkstemp(suffix=".tar.tmp", dir=self.content_dir)
+        os.close(fd)
+        try:
+            with tarfile.open(tar_path, "w") as tar:
+                for path in self._artifact_paths(session_id):
+                    tar.add(path, arcname=os.path.relpath(path, self.content_dir))
+            return self.backend.put(f"{session_id}.artifacts.tar", tar_path)
+        except Exception as e:
+            logger.warning(f"Archiving session {session_id} failed: {e}")
+            self._count("errors")
+            return None
+        finally:
+            os.remove(tar_path)
+
+    def archive_source(self, session_id, pdf_path):
+        """Upload the session's source PDF; returns the backend's object ID or None."""
+        if not self.backend:
+            return None
+        try:
+            return self.backend.put(f"{session_id}.source.pdf", pdf_path)
+        except Exception as e:
+            logger.warning(f"Archiving the PDF of session {session_id} failed: {e}")
+            self._count("errors")
+            return None
+
+    def _fetched_path(self, session_id):
+        return os.path.join(self.content_dir, f"{session_id}.fetched")
+
+    def _mark_fetched(self, session_id):
+        with open(self._fetched_path(session_id), "w"):
+            pass  # Creating or truncating the file updates its mtime
+
+    def claim(self, session_id):
+        """Stop refreshing the local copy; this node now writes the session."""
+        try:
+            os.remove(self._fetched_path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def fetch_source(self, session_id, pdf_path):
+        """Download the session's archived PDF; False if there is none."""
+        if not self.backend or not _valid_session_id(session_id):
+            return False
+        try:
+            return self.backend.get(f"{session_id}.source.pdf", pdf_path)
+        except Exception as e:
+            logger.warning(f"Fetching the PDF of session {session_id} failed: {e}")
+            self._count("errors")
+            return False
+
+    def _needs_refresh(self, session_id):
+        try:
+            fetched_at = os.path.getmtime(self._fetched_path(session_id))
+        except OSError:
+            return False  # Created on this node, or never fetched
+        if time.time() - fetched_at < SESSION_REFRESH_SECONDS:
+            return False
+        content = load_content(self.content_dir, session_id)
+        return bool(content) and content.get("status") == "processing"
+
+    def _member_target(self, session_id, name):
+        """Map an archive member to its path in the content directory, or None."""
+        if name in (
+            f"{session_id}.json",
+            f"{session_id}.pages",
+            f"{session_id}.pages.idx",
+        ):
+            return name
+        table_prefix = f"{session_id}.tables/"
+        if name.startswith(table_prefix):
+            file_name = name[len(table_prefix) :]
+            if file_name and "/" not in file_name and not file_name.startswith("."):
+                return name
+        return None
+
+    def _fetch_artifacts(self, session_id):
+        """Fetch and unpack the archived artifacts; False if none are archived."""
+        staging = tempfile.mkdtemp(prefix=f".{session_id}.", dir=self.content_dir)
+        try:
+            tar_path = os.path.join(staging, "artifacts.tar")
+            if not self.backend.get(f"{session_id}.artifacts.tar", tar_path):
+                return False
+
+            # Only the files a session consists of are unpacked; anything else
+            # in the archive (links, absolute paths, "..") is ignored
+            unpacked = []
+            with tarfile.open(tar_path, "r") as tar:
+                for member in tar:
+                    target = self._member_target(session_id, member.name)
+                    if not target or not member.isfile():
+                        continue
+                    path = os.path.join(staging, target)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with tar.extractfile(member) as src, open(path, "wb") as dst:
+                        shutil.copyfileobj(src, dst, COPY_BLOCK_SIZE)
+                    unpacked.append(target)
+
+            json_name = f"{session_id}.json"
+            if json_name not in unpacked:
+                return False
+
+            # Move everything into place with the content JSON last, so
+            # readers see either the old session or the complete new one
+            table_dir = f"{session_id}.tables"
+            if os.path.isdir(os.path.join(staging, table_dir)):
+                self._replace_dir(
+                    os.path.join(staging, table_dir),
+                    os.path.join(self.content_dir, table_dir),
+                )
+            for name in (f"{session_id}.pages", f"{session_id}.pages.idx", json_name):
+                if name in unpacked:
+                    os.replace(
+                        os.path.join(staging, name),
+                        os.path.join(self.content_dir, name),
+                    )
+            return True
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _replace_dir(self, source, destination):
+        if not os.path.exists(destination):
+            os.replace(source, destination)
+            return
+        old = f"{destination}.{os.getpid()}.old"
+        os.replace(destination, old)
+        os.replace(source, destination)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def _rebuild_from_source(self, session_id):
+        """Download the archived PDF and re-extract it; False if there is none."""
+        if not self.rebuild:
+            return False
+        fd, pdf_path = tempfile.mkstemp(suffix=".pdf", dir=self.content_dir)
+        os.close(fd)
+        try:
+            if not self.backend.get(f"{session_id}.source.pdf", pdf_path):
+                return False
+            # rebuild() owns the file from here on
+            self.rebuild(session_id, pdf_path)
+            pdf_path = None
+            return os.path.exists(content_path(self.content_dir, session_id))
+        finally:
+            if pdf_path and os.path.exists(pdf_path):
+                os.remove(pdf_path)
+
+    def ensure_local(self, session_id):
+        """
+        Make sure the session is in the local content directory.
+
+        Returns True if the session is available locally afterwards.
+        """
+        local = os.path.exists(content_path(self.content_dir, session_id))
+        if not self.backend or not _valid_session_id(session_id):
+            return local
+        if local and not self._needs_refresh(session_id):
+            self._count("local_hits")
+            return True
+
+        with self._lock_for(session_id):
+            # Another thread may have fetched it while we waited
+            local = os.path.exists(content_path(self.content_dir, session_id))
+            if local and not self._needs_refresh(session_id):
+                self._count("local_hits")
+                return True
+
+            try:
+                if local:
+                    # Other processes wait for the next interval even if this
+                    # refresh fails
+                    self._mark_fetched(session_id)
+                if self._fetch_artifacts(session_id):
+                    self._mark_fetched(session_id)
+                    self._count("refreshes" if local else "artifact_fetches")
+                    return True
+                if local:
+                    return True
+                if self._rebuild_from_source(session_id):
+                    self._count("rebuilds")
+                    return True
+            except Exception as e:
+                logger.warning(f"Fetching session {session_id} failed: {e}")
+                self._count("errors")
+                return local
+
+        self._count("misses")
+        return False
+
+    def stats(self):
+        with self._registry_lock:
+            stats = dict(self.counters)
+        stats["backend"] = type(self.backend).__name__ if self.backend else None
+        return stats
@@ -0,0 +1,82 @@
+import os
+import json
+import time
+from .page_store import PageReader, has_pages
+
+
+def content_path(content_dir, session_id):
+    return os.path.join(content_dir, f"{session_id}.json")
+
+
+def load_content(content_dir, session_id):
+    """Load a session's extracted content, or None if it does not exist."""
+    path = content_path(content_dir, session_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_content(content_dir, session_id, content):
+    """
+    Write a session's content atomically, so readers never see a partial file
+    while background ingestion is still appending pages.
+
+    Each save stamps content["updated_at"], the heartbeat that tells whether
+    ingestion of a "processing" session is still alive.
+    """
+    content["updated_at"] = time.time()
+    path = content_path(content_dir, session_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def ingestion_progress(content):
+    """Describe how far background ingestion of the document has got."""
+    page_count = content.get("page_count")
+    if not page_count:
+        return None  # Sessions created before progressive ingestion
+    pages_done = content.get("pages_done", page_count)
+    return {
+        "pages_done": pages_done,
+        "total": page_count,
+        "complete": pages_done >= page_count,
+        "status": content.get("status"),
+    }
+
+
+def ingestion_stalled(content_dir, session_id, content, max_age):
+    """
+    True if the session is still "processing" but nothing has saved progress
+    for max_age seconds, e.g. because the ingesting process was restarted.
+    """
+    if content.get("status") != "processing":
+        return False
+    updated_at = content.get("updated_at")
+    if updated_at is None:
+        # Saved before the heartbeat; the file's age is the best guess
+        try:
+            updated_at = os.path.getmtime(content_path(content_dir, session_id))
+        except OSError:
+            return False
+    return time.time() - updated_at > max_age
+
+
+def load_text(content_dir, session_id, content, max_chars=None):
+    """
+    Return up to max_chars of the session's text with "[Page N]" markers.
+
+    Returns (text, first_page, last_page), the page range actually included.
+    Text is sliced lazily from the memory-mapped page store; sessions saved
+    before per-page storage keep their text inline in the content JSON and
+    have no page range.
+    """
+    if "text" in content:
+        text = content["text"][:max_chars] if max_chars else content["text"]
+        return text, None, None
+    if not has_pages(content_dir, session_id):
+        return "", None, None
+    with PageReader(content_dir, session_id) as pages:
+        return pages.text(max_chars)
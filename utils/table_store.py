@@ -0,0 +1,363 @@
+import os
+import re
+import json
+import threading
+from collections import OrderedDict, defaultdict
+
+# Tables extracted for a session, stored once in a columnar layout:
+#   <session_id>.tables/<n>.text.npy  cell text, column-major (rows x cols)
+#   <session_id>.tables/<n>.num.npy   cells parsed as floats (NaN if not numeric)
+#   <session_id>.tables/index.json    normalized headers per table and an
+#                                     inverted index: term -> [[table, row, col]]
+# Row -1 in a posting means the term matched the column header. The arrays
+# are memory-mapped on read, so only the cells that are rendered get touched.
+# NumPy is imported lazily, like the other heavy modules, to keep cold starts
+# fast.
+
+MAX_CONTEXT_ROWS = int(os.getenv("TABLE_CONTEXT_ROWS", 20))
+MAX_CONTEXT_CHARS = int(os.getenv("TABLE_CONTEXT_CHARS", 4000))
+OVERVIEW_ROWS = 3  # Rows per table shown when nothing in the question matches
+STORE_CACHE_SIZE = 32  # Parsed indexes kept per process, see open_table_store()
+
+STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "are",
+    "as",
+    "at",
+    "be",
+    "by",
+    "did",
+    "do",
+    "does",
+    "for",
+    "from",
+    "how",
+    "in",
+    "is",
+    "it",
+    "of",
+    "on",
+    "or",
+    "the",
+    "this",
+    "to",
+    "was",
+    "were",
+    "what",
+    "when",
+    "which",
+    "who",
+    "with",
+}
+
+_NUMBER_RE = re.compile(r"^\(?-?[$€£]?\s*[\d,]*\.?\d+\s*%?\)?$")
+
+
+def tokenize(text):
+    """Lowercase terms for indexing; thousands separators are dropped."""
+    text = re.sub(r"(?<=\d),(?=\d{3})", "", str(text).lower())
+    return [
+        term
+        for term in re.findall(r"[a-z0-9]+(?:\.\d+)?", text)
+        if term not in STOPWORDS
+    ]
+
+
+def parse_number(cell):
+    """Parse '1,234', '$5.2', '(12)' or '8%' as a float, or return None."""
+    cell = str(cell).strip()
+    if not cell or not _NUMBER_RE.match(cell):
+        return None
+    negative = (cell.startswith("(") and cell.endswith(")")) or "-" in cell
+    digits = re.sub(r"[^\d.]", "", cell)
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def normalize_headers(row):
+    """Collapse whitespace, fill blanks and de-duplicate header names."""
+    headers = []
+    seen = defaultdict(int)
+    for i, cell in enumerate(row):
+        name = " ".join(str(cell).split()) or f"column {i + 1}"
+        seen[name.lower()] += 1
+        if seen[name.lower()] > 1:
+            name = f"{name} ({seen[name.lower()]})"
+        headers.append(name)
+    return headers
+
+
+def _looks_like_header(row):
+    cells = [cell for cell in row if str(cell).strip()]
+    if not cells:
+        return False
+    numeric = sum(parse_number(cell) is not None for cell in cells)
+    return numeric <= len(cells) // 2
+
+
+def _parse_table(table_json):
+    """Turn a camelot records-JSON table into (headers, rows of cell text)."""
+    records = json.loads(table_json)
+    if isinstance(records, dict):
+        records = [records]
+    keys = sorted({key for record in records for key in record}, key=_column_key)
+    rows = [
+        ["" if record.get(key) is None else str(record.get(key)) for key in keys]
+        for record in records
+    ]
+    rows = [row for row in rows if any(cell.strip() for cell in row)]
+    if rows and _looks_like_header(rows[0]):
+        return normalize_headers(rows[0]), rows[1:]
+    return normalize_headers([""] * len(keys)), rows
+
+
+def _column_key(key):
+    return (0, int(key)) if str(key).isdigit() else (1, str(key))
+
+
+def _paths(content_dir, session_id):
+    table_dir = os.path.join(content_dir, f"{session_id}.tables")
+    return table_dir, os.path.join(table_dir, "index.json")
+
+
+def has_tables(content_dir, session_id):
+    return os.path.exists(_paths(content_dir, session_id)[1])
+
+
+def _load_index(index_path):
+    if not os.path.exists(index_path):
+        return {"tables": [], "terms": {}}
+    with open(index_path, "r") as f:
+        return json.load(f)
+
+
+def append_tables(content_dir, session_id, tables):
+    """Store camelot JSON tables in columnar form and index them; returns the count."""
+    import numpy as np
+
+    table_dir, index_path = _paths(content_dir, session_id)
+    os.makedirs(table_dir, exist_ok=True)
+    index = _load_index(index_path)
+    terms = defaultdict(list, index["terms"])
+    added = 0
+
+    for table_json in tables:
+        try:
+            headers, rows = _parse_table(table_json)
+        except (ValueError, TypeError) as e:
+            print(f"Error storing table: {e}")
+            continue
+        if not rows:
+            continue
+
+        table_id = len(index["tables"])
+        text = np.array(rows, dtype=str).reshape(len(rows), len(headers))
+        numbers = np.array(
+            [[parse_number(cell) for cell in row] for row in rows], dtype=float
+        ).reshape(text.shape)
+        base = os.path.join(table_dir, str(table_id))
+        np.save(f"{base}.text.npy", np.asfortranarray(text))
+        np.save(f"{base}.num.npy", np.asfortranarray(numbers))
+
+        for col, header in enumerate(headers):
+            for term in set(tokenize(header)):
+                terms[term].append([table_id, -1, col])
+            for row_index, row in enumerate(rows):
+                for term in set(tokenize(row[col])):
+                    terms[term].append([table_id, row_index, col])
+
+        index["tables"].append({"id": table_id, "headers": headers, "rows": len(rows)})
+        added += 1
+
+    index["terms"] = terms
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+    return added
+
+
+class TableStore:
+    """Read side of the table store: finds the rows and columns a question needs."""
+
+    def __init__(self, content_dir, session_id):
+        self.table_dir, index_path = _paths(content_dir, session_id)
+        index = _load_index(index_path)
+        self.tables = index["tables"]
+        self.terms = index["terms"]
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.tables)
+
+    def _load(self, table_id, kind):
+        import numpy as np
+
+        key = (table_id, kind)
+        if key not in self._arrays:
+            path = os.path.join(self.table_dir, f"{table_id}.{kind}.npy")
+            self._arrays[key] = np.load(path, mmap_mode="r", allow_pickle=False)
+        return self._arrays[key]
+
+    def cell(self, table_id, row, col):
+        return str(self._load(table_id, "text")[row, col])
+
+    def number(self, table_id, row, col):
+        """Return the parsed numeric value of a cell, or None."""
+        value = float(self._load(table_id, "num")[row, col])
+        return None if value != value else value  # NaN check
+
+    def match(self, question):
+        """
+        Score rows and columns against the question's terms.
+
+        Returns {table_id: {"rows": {row: score}, "cols": {col: score}}}.
+        """
+        matches = defaultdict(
+            lambda: {"rows": defaultdict(int), "cols": defaultdict(int)}
+        )
+        for term in set(tokenize(question)):
+            for table_id, row, col in self.terms.get(term, []):
+                if row == -1:
+                    matches[table_id]["cols"][col] += 1
+                else:
+                    matches[table_id]["rows"][row] += 1
+        return matches
+
+    def _render(self, table_id, rows, cols):
+        headers = self.tables[table_id]["headers"]
+        lines = [" | ".join(headers[col] for col in cols)]
+        for row in rows:
+            lines.append(" | ".join(self.cell(table_id, row, col) for col in cols))
+        return f"Table {table_id + 1}:\n" + "\n".join(lines)
+
+    def context_for(
+        self, questions, max_rows=MAX_CONTEXT_ROWS, max_chars=MAX_CONTEXT_CHARS
+    ):
+        """
+        Render only the table rows and columns relevant to the question(s).
+
+        If nothing matches, a short overview (headers and first rows of each
+        table) is returned instead so the model still knows what is there.
+        """
+        if isinstance(questions, str):
+            questions = [questions]
+
+        merged = defaultdict(
+            lambda: {"rows": defaultdict(int), "cols": defaultdict(int)}
+        )
+        for question in questions:
+            for table_id, hits in self.match(question).items():
+                for row, score in hits["rows"].items():
+                    merged[table_id]["rows"][row] += score
+                for col, score in hits["cols"].items():
+                    merged[table_id]["cols"][col] += score
+
+        sections = []
+        used = 0
+        # Tables with matching rows first, then those matching only headers
+        ranked = sorted(
+            merged.items(),
+            key=lambda item: (
+                not item[1]["rows"],
+                -sum(item[1]["rows"].values()) - sum(item[1]["cols"].values()),
+            ),
+        )
+        for table_id, hits in ranked:
+            if used >= max_chars:
+                break
+            table = self.tables[table_id]
+            all_cols = list(range(len(table["headers"])))
+            if hits["cols"]:
+                # Keep the row label column next to the matched columns
+                cols = sorted({0} | set(hits["cols"]))
+            else:
+                cols = all_cols
+            if hits["rows"]:
+                rows = sorted(hits["rows"], key=lambda r: (-hits["rows"][r], r))
+                rows = sorted(rows[:max_rows])
+            else:
+                rows = list(range(min(table["rows"], max_rows)))
+            section = self._render(table_id, rows, cols)
+            if used + len(section) > max_chars and sections:
+                break
+            sections.append(section)
+            used += len(section)
+
+        if not sections:
+            for table in self.tables:
+                rows = list(range(min(table["rows"], OVERVIEW_ROWS)))
+                section = self._render(table["id"], rows, range(len(table["headers"])))
+                if used + len(section) > max_chars and sections:
+                    break
+                sections.append(section)
+                used += len(section)
+
+        return "\n\n".join(sections)
+
+    def lookup(self, question):
+        """
+        Answer a simple "<column> of <row>" lookup locally.
+
+        Returns (answer, table_id) when exactly one cell is unambiguously
+        matched by both its row and column, otherwise None.
+        """
+        best = []
+        for table_id, hits in self.match(question).items():
+            value_cols = [col for col in hits["cols"] if col != 0]
+            label_rows = [
+                row
+                for row in hits["rows"]
+                if tokenize(self.cell(table_id, row, 0))
+                and set(tokenize(self.cell(table_id, row, 0)))
+                <= set(tokenize(question))
+            ]
+            if len(value_cols) == 1 and len(label_rows) == 1:
+                best.append((table_id, label_rows[0], value_cols[0]))
+
+        if len(best) != 1:
+            return None
+        table_id, row, col = best[0]
+        value = self.cell(table_id, row, col).strip()
+        if not value:
+            return None
+        header = self.tables[table_id]["headers"][col]
+        label = self.cell(table_id, row, 0).strip()
+        return f"{label}, {header}: {value} (Table {table_id + 1})", table_id
+
+
+_store_cache = OrderedDict()
+_store_cache_lock = threading.Lock()
+
+
+def open_table_store(content_dir, session_id):
+    """
+    Return a TableStore, reusing the parsed index while it is unchanged.
+
+    Parsing the inverted index dominates the cost of a lookup, so recently
+    used stores are cached per process and reloaded when ingestion appends
+    more tables.
+    """
+    _, index_path = _paths(content_dir, session_id)
+    try:
+        version = os.stat(index_path).st_mtime_ns
+    except OSError:
+        version = None
+
+    with _store_cache_lock:
+        cached = _store_cache.get(index_path)
+        if cached and cached[0] == version:
+            _store_cache.move_to_end(index_path)
+            return cached[1]
+
+    store = TableStore(content_dir, session_id)
+    with _store_cache_lock:
+        _store_cache[index_path] = (version, store)
+        while len(_store_cache) > STORE_CACHE_SIZE:
+            _store_cache.popitem(last=False)
+    return store
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import hashlib
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Resumable upload limits. Each chunk is a separate request, so CHUNK_SIZE
+# must stay below Flask's MAX_CONTENT_LENGTH.
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 200 * 1024 * 1024))  # 200MB
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 5 * 1024 * 1024))  # 5MB
+STALE_UPLOAD_SECONDS = int(os.getenv("STALE_UPLOAD_SECONDS", 24 * 60 * 60))
+
+PDF_MAGIC = b"%PDF-"
+READ_BLOCK_SIZE = 64 * 1024
+
+# Running SHA-256 per upload, so chunks are hashed as they are written. If a
+# chunk lands on another worker (or after a restart) the hash is rebuilt from
+# the bytes already on disk. Writers serialize on an flock of the part file,
+# which also holds across gunicorn workers.
+_hashers = {}
+
+
+class UploadError(Exception):
+    """An upload request that cannot be accepted, with its HTTP status code."""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+def _paths(upload_dir, upload_id):
+    try:
+        upload_id = uuid.UUID(upload_id).hex  # Reject anything but a UUID
+    except (ValueError, TypeError, AttributeError):
+        raise UploadError("Unknown upload", 404)
+    base = os.path.join(upload_dir, upload_id)
+    return upload_id, f"{base}.json", f"{base}.part"
+
+
+@contextmanager
+def _locked_part(part_path):
+    """Open the part file with an exclusive lock shared by all processes."""
+    try:
+        fd = os.open(part_path, os.O_RDWR)
+    except FileNotFoundError:
+        raise UploadError("Unknown upload", 404)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # Finalized or aborted by another writer while we waited
+        try:
+            if os.stat(part_path).st_ino != os.fstat(fd).st_ino:
+                raise UploadError("Unknown upload", 404)
+        except FileNotFoundError:
+            raise UploadError("Unknown upload", 404)
+        yield fd
+    finally:
+        os.close(fd)  # Also releases the lock
+
+
+def _save_state(state_path, state):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _hasher_at(upload_id, part_path, offset):
+    """Return a SHA-256 object covering exactly the first `offset` bytes."""
+    cached = _hashers.get(upload_id)
+    if cached and cached[0] == offset:
+        return cached[1]
+
+    hasher = hashlib.sha256()
+    with open(part_path, "rb") as f:
+        remaining = offset
+        while remaining:
+            block = f.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def cleanup_stale_uploads(upload_dir, max_age=STALE_UPLOAD_SECONDS):
+    """Delete partial uploads that have not been touched for max_age seconds."""
+    cutoff = time.time() - max_age
+    for name in os.listdir(upload_dir):
+        if not name.endswith((".json", ".part")):
+            continue
+        path = os.path.join(upload_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            continue
+
+    # Forget running hashes of uploads that are gone (including ones removed
+    # by another worker)
+    for upload_id in list(_hashers):
+        if not os.path.exists(os.path.join(upload_dir, f"{upload_id}.part")):
+            _hashers.pop(upload_id, None)
+
+
+def init_upload(upload_dir, filename, size):
+    """Start a resumable upload and return its state."""
+    if not filename or not filename.lower().endswith(".pdf"):
+        raise UploadError("Invalid file type. Only PDF files are allowed.")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("File size must be a positive integer")
+    if size > MAX_UPLOAD_SIZE:
+        raise UploadError(
+            f"File too large. Max size allowed is {MAX_UPLOAD_SIZE // (1024 * 1024)}MB.",
+            413,
+        )
+
+    cleanup_stale_uploads(upload_dir)
+
+    upload_id = uuid.uuid4().hex
+    _, state_path, part_path = _paths(upload_dir, upload_id)
+    open(part_path, "wb").close()
+    state = {
+        "upload_id": upload_id,
+        "filename": filename,
+        "size": size,
+        "chunk_size": CHUNK_SIZE,
+        "created_at": time.time(),
+    }
+    _save_state(state_path, state)
+    return dict(state, offset=0)
+
+
+def get_upload(upload_dir, upload_id):
+    """Return the upload state including the number of bytes received."""
+    upload_id, state_path, part_path = _paths(upload_dir, upload_id)
+    if not os.path.exists(state_path) or not os.path.exists(part_path):
+        raise UploadError("Unknown upload", 404)
+    with open(state_path, "r") as f:
+        state = json.load(f)
+    state["offset"] = os.path.getsize(part_path)
+    return state
+
+
+def write_chunk(upload_dir, upload_id, offset, stream, length):
+    """
+    Append `length` bytes from `stream` at `offset` and return the new offset.
+
+    The offset must equal the bytes already received; otherwise a 409 is
+    raised carrying the current offset so the client can resume from there.
+    """
+    state = get_upload(upload_dir, upload_id)
+    upload_id, state_path, part_path = _paths(upload_dir, upload_id)
+
+    with _locked_part(part_path) as fd:
+        current = os.fstat(fd).st_size
+        if offset != current:
+            raise UploadError("Offset mismatch", 409, offset=current)
+        if length is None or length <= 0:
+            raise UploadError("Missing chunk body")
+        if length > CHUNK_SIZE:
+            raise UploadError(
+                f"Chunk too large. Max chunk size is {CHUNK_SIZE} bytes.", 413
+            )
+        if current + length > state["size"]:
+            raise UploadError("Chunk exceeds declared file size", 400, offset=current)
+
+        hasher = _hasher_at(upload_id, part_path, current)
+        written = current
+        try:
+            remaining = length
+            while remaining:
+                block = stream.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break  # Client went away; keep what we have
+
+                # Reject non-PDF uploads as soon as the header arrives
+                if written < len(PDF_MAGIC):
+                    piece = block[: len(PDF_MAGIC) - written]
+                    if piece != PDF_MAGIC[written : written + len(piece)]:
+                        raise UploadError("Invalid file. Not a PDF document.")
+
+                # Write at the checked offset, never wherever the end is now
+                view = memoryview(block)
+                while view:
+                    count = os.pwrite(fd, view, written)
+                    hasher.update(view[:count])
+                    written += count
+                    view = view[count:]
+                remaining -= len(block)
+        except UploadError:
+            abort_upload(upload_dir, upload_id)
+            raise
+        finally:
+            if os.path.exists(part_path):
+                _hashers[upload_id] = (written, hasher)
+
+    return written
+
+
+def finalize_upload(upload_dir, upload_id, expected_sha256=None):
+    """
+    Verify a completed upload and move it into place.
+
+    Returns (pdf_path, filename, sha256). The hash was computed while the
+    chunks were written, so the file is not read again here.
+    """
+    state = get_upload(upload_dir, upload_id)
+    upload_id, state_path, part_path = _paths(upload_dir, upload_id)
+
+    with _locked_part(part_path) as fd:
+        received = os.fstat(fd).st_size
+        if received != state["size"]:
+            raise UploadError("Upload incomplete", 409, offset=received)
+
+        sha256 = _hasher_at(upload_id, part_path, received).hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            abort_upload(upload_dir, upload_id)
+            raise UploadError("Checksum mismatch. Please upload the file again.")
+
+        pdf_path = os.path.join(upload_dir, f"{upload_id}.pdf")
+        os.replace(part_path, pdf_path)
+        os.remove(state_path)
+        _hashers.pop(upload_id, None)
+
+    return pdf_path, state["filename"], sha256
+
+
+def abort_upload(upload_dir, upload_id):
+    """Discard a partial upload."""
+    upload_id, state_path, part_path = _paths(upload_dir, upload_id)
+    _hashers.pop(upload_id, None)
+    for path in (state_path, part_path):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,339 @@
+import os
+import sys
+import time
+import types
+import logging
+import threading
+import importlib
+import multiprocessing
+from dotenv import load_dotenv
+from .limit_utils import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+# Load environment variables from .env file
+load_dotenv()
+
+# PDF extraction (PyMuPDF, camelot with its ghostscript/opencv stack) runs in
+# dedicated subprocesses so a pathological file cannot take the web worker
+# down or leave its memory fragmented. 0 workers runs jobs in-process.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", 2))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", 120))  # Per job
+EXTRACTION_MAX_JOBS = int(os.getenv("EXTRACTION_MAX_JOBS", 20))  # Then recycle
+EXTRACTION_RSS_LIMIT_MB = int(os.getenv("EXTRACTION_RSS_LIMIT_MB", 1024))
+RSS_CHECK_INTERVAL = 0.25  # Seconds between memory checks while a job runs
+# How long a job waits for a free worker. Interactive jobs (an upload waiting
+# for its first pages) go ahead of background ones, and background jobs leave
+# one worker free for them when the pool has more than one.
+QUEUE_TIMEOUTS = {
+    PRIORITY_INTERACTIVE: float(os.getenv("EXTRACTION_QUEUE_TIMEOUT", 30)),
+    PRIORITY_BACKGROUND: float(os.getenv("EXTRACTION_BACKGROUND_QUEUE_TIMEOUT", 600)),
+}
+
+
+class ExtractionError(Exception):
+    """Raised when an extraction job crashes, times out or exceeds its memory cap."""
+
+
+def detach_main_module():
+    """
+    Keep spawned workers from re-running the __main__ script.
+
+    spawn imports the parent's main script in every worker (as __mp_main__),
+    which for `python app.py` would build the whole web app again. Call this
+    from the script's __main__ block, before the first worker starts, so
+    workers see an empty main module instead. Runners such as gunicorn have
+    a lean main script already and need no call.
+    """
+    sys.modules["__main__"] = types.ModuleType("__main__")
+
+
+def _worker_main(conn, module_name, initializer):
+    """Subprocess loop: run named functions from module_name until told to stop."""
+    module = importlib.import_module(module_name)
+    if initializer:
+        getattr(module, initializer)()
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        name, args = job
+        try:
+            conn.send(("ok", getattr(module, name)(*args)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def _rss_bytes(pid):
+    """Resident set size of a process, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    def __init__(self, context, module_name, initializer):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, module_name, initializer),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.background = False
+
+    def rss_bytes(self):
+        return _rss_bytes(self.process.pid)
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionPool:
+    """
+    A pool of recycled subprocess workers for extraction jobs.
+
+    Each job runs with a wall-clock timeout and an RSS cap; a worker that
+    hangs, crashes or grows past the cap is killed and the job fails with
+    ExtractionError. Workers are also replaced after max_jobs jobs so memory
+    fragmentation does not accumulate. Workers start lazily on first use.
+    A job that waits longer than its priority's queue timeout for a worker
+    fails with ExtractionError as well.
+    """
+
+    def __init__(
+        self,
+        size=EXTRACTION_WORKERS,
+        job_timeout=EXTRACTION_TIMEOUT,
+        max_jobs=EXTRACTION_MAX_JOBS,
+        rss_limit_mb=EXTRACTION_RSS_LIMIT_MB,
+        module_name="utils.pdf_utils",
+        initializer="preload_extractors",
+        queue_timeouts=None,
+    ):
+        self.size = size
+        self.job_timeout = job_timeout
+        self.max_jobs = max_jobs
+        self.rss_limit = rss_limit_mb * 1024 * 1024 if rss_limit_mb else None
+        self.module_name = module_name
+        self.initializer = initializer
+        self.queue_timeouts = queue_timeouts or QUEUE_TIMEOUTS
+        # spawn, not fork: the web worker has threads and open sockets
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = []
+        self._live = 0
+        self._busy = 0
+        self._background_busy = 0
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self._condition = threading.Condition()
+        self.counters = {
+            "jobs_completed": 0,
+            "jobs_failed": 0,
+            "timeouts": 0,
+            "crashes": 0,
+            "memory_kills": 0,
+            "recycled": 0,
+            "worker_restarts": 0,
+            "queue_timeouts": 0,
+        }
+
+    def _count(self, name):
+        with self._condition:
+            self.counters[name] += 1
+
+    def _can_start(self, background):
+        if not self._idle and self._live >= self.size:
+            return False
+        if background:
+            if self._waiting[PRIORITY_INTERACTIVE]:
+                return False
+            if self.size > 1 and self._background_busy >= self.size - 1:
+                return False  # Keep a worker for interactive jobs
+        return True
+
+    def _checkout(self, priority=PRIORITY_INTERACTIVE):
+        background = priority != PRIORITY_INTERACTIVE
+        timeout = self.queue_timeouts.get(
+            priority, self.queue_timeouts[PRIORITY_INTERACTIVE]
+        )
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while not self._can_start(background):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["queue_timeouts"] += 1
+                        raise ExtractionError(
+                            f"No extraction worker became free within {timeout}s"
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting[priority] -= 1
+                # Background jobs may have been held back for this one
+                self._condition.notify_all()
+            self._busy += 1
+            self._background_busy += background
+            # An idle worker may have been killed since its last job (e.g. by
+            # the OOM killer); replace it rather than send it a job
+            worker = None
+            dead = []
+            while self._idle and worker is None:
+                candidate = self._idle.pop()
+                if candidate.process.is_alive():
+                    worker = candidate
+                else:
+                    dead.append(candidate)
+                    self._live -= 1
+                    self.counters["crashes"] += 1
+                    self.counters["worker_restarts"] += 1
+            if worker is None:
+                self._live += 1
+
+        for candidate in dead:
+            candidate.stop(kill=True)
+        if worker is not None:
+            worker.background = background
+            return worker
+
+        try:
+            worker = _Worker(self._context, self.module_name, self.initializer)
+        except Exception:
+            with self._condition:
+                self._live -= 1
+                self._busy -= 1
+                self._background_busy -= background
+                self._condition.notify_all()
+            raise
+        worker.background = background
+        return worker
+
+    def _checkin(self, worker, healthy):
+        """Return a worker to the pool, or retire it if it should not run again."""
+        retire = not healthy
+        if healthy and worker.jobs >= self.max_jobs:
+            retire = True
+            self._count("recycled")
+        elif healthy and self.rss_limit:
+            rss = worker.rss_bytes()
+            if rss and rss > self.rss_limit:
+                retire = True
+                self._count("recycled")
+
+        if retire:
+            worker.stop(kill=not healthy)
+
+        with self._condition:
+            self._busy -= 1
+            self._background_busy -= worker.background
+            if retire:
+                self._live -= 1
+                self.counters["worker_restarts"] += 1
+            else:
+                self._idle.append(worker)
+            self._condition.notify_all()
+
+    def run(self, name, *args, timeout=None, priority=PRIORITY_INTERACTIVE):
+        """Run module_name.<name>(*args) in a worker and return its result."""
+        if self.size <= 0:
+            return getattr(importlib.import_module(self.module_name), name)(*args)
+
+        timeout = timeout or self.job_timeout
+        worker = self._checkout(priority)
+        healthy = False
+        try:
+            try:
+                worker.conn.send((name, args))
+            except (OSError, EOFError):
+                self._count("crashes")
+                raise ExtractionError("Extraction worker crashed")
+            deadline = time.monotonic() + timeout
+            while not worker.conn.poll(RSS_CHECK_INTERVAL):
+                if not worker.process.is_alive():
+                    self._count("crashes")
+                    raise ExtractionError(
+                        f"Extraction worker crashed (exit code {worker.process.exitcode})"
+                    )
+                rss = worker.rss_bytes()
+                if self.rss_limit and rss and rss > self.rss_limit:
+                    self._count("memory_kills")
+                    raise ExtractionError(
+                        f"Extraction exceeded the {self.rss_limit // (1024 * 1024)}MB memory limit"
+                    )
+                if time.monotonic() > deadline:
+                    self._count("timeouts")
+                    raise ExtractionError(f"Extraction timed out after {timeout}s")
+
+            try:
+                status, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                self._count("crashes")
+                raise ExtractionError("Extraction worker crashed")
+
+            worker.jobs += 1
+            healthy = True
+            if status != "ok":
+                raise ExtractionError(payload)
+            self._count("jobs_completed")
+            return payload
+        except ExtractionError as e:
+            logger.warning(f"Extraction job {name} failed: {e}")
+            self._count("jobs_failed")
+            raise
+        finally:
+            self._checkin(worker, healthy)
+
+    def start(self):
+        """Start all workers ahead of the first job (they pre-load their modules)."""
+        if self.size <= 0:
+            if self.initializer:
+                module = importlib.import_module(self.module_name)
+                getattr(module, self.initializer)()
+            return
+
+        workers = []
+        try:
+            for _ in range(self.size):
+                workers.append(self._checkout())
+        finally:
+            for worker in workers:
+                self._checkin(worker, True)
+
+    def shutdown(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+        for worker in idle:
+            worker.stop()
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self.counters)
+            stats.update(
+                {
+                    "size": self.size,
+                    "live_workers": self._live,
+                    "busy_workers": self._busy,
+                    "utilization": round(self._busy / self.size, 2) if self.size else 0,
+                }
+            )
+        return stats